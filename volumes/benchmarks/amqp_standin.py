@@ -0,0 +1,669 @@
+"""Minimale AMQP 0-9-1 broker om lokaal tegen te meten, zonder RabbitMQ.
+
+Spreekt het protocol via de frame-codec van pika (pika.frame / pika.spec) en kent
+exchanges, queues en bindings met de foutcodes van RabbitMQ (406 bij een afwijkende
+herdeclaratie, 404 bij een onbekende exchange of queue). Berichten worden gerouteerd
+via de default exchange en direct-, topic- (* en #) en fanout-exchanges, opgeslagen
+per queue en afgeleverd aan consumers met prefetch, ack/nack/reject, publisher
+confirms en mandatory returns. Elke synchrone RPC kan een vaste vertraging krijgen om
+de round-trip naar een echte broker na te bootsen, en met nack_every wordt elke n-de
+bevestigde publicatie per kanaal geweigerd (Basic.Nack) om foutpaden van clients te testen. Kanalen worden onafhankelijk van
+elkaar afgehandeld, binnen een kanaal op volgorde. Alles draait op één asyncio-loop,
+dus de brokerstaat alleen via die loop (of na stop()) lezen.
+
+Voor load-tests houdt de broker per queue bij hoeveel berichten er binnenkwamen en hoe
+lang ze wachtten tussen publish en aflevering aan een consumer (routeringslatency), en
+kan hij de queuediepte periodiek vastleggen. stats() geeft daar een momentopname van;
+BrokerProcess maakt die ook vanuit een ander proces opvraagbaar.
+
+    broker = StandinBroker(rpc_latency=0.002)
+    port = broker.start()
+    ...
+    broker.stop()
+"""
+import asyncio
+import itertools
+import os
+import struct
+import sys
+import threading
+from collections import defaultdict, deque
+
+import pika.frame
+import pika.spec as spec
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'topology'))
+
+from topology import topic_matches  # noqa: E402
+
+SERVER_PROPERTIES = {
+    'product': 'attendify-standin',
+    'capabilities': {
+        'publisher_confirms': True,
+        'basic.nack': True,
+        'consumer_cancel_notify': True,
+        'exchange_exchange_bindings': True,
+        'connection.blocked': True,
+        'authentication_failure_close': True,
+        'per_consumer_qos': True,
+    },
+}
+FRAME_MAX = 131072
+# Per queue de laatste zoveel latencies voor de percentielen
+LATENCY_SAMPLES = 100000
+
+
+class ChannelError(Exception):
+    """Fout die (zoals bij RabbitMQ) het kanaal sluit"""
+
+    def __init__(self, reply_code, reply_text):
+        super().__init__(reply_text)
+        self.reply_code = reply_code
+        self.reply_text = reply_text
+
+
+class Message:
+    __slots__ = ('exchange', 'routing_key', 'properties', 'body', 'published', 'redelivered')
+
+    def __init__(self, exchange, routing_key, properties, body, published):
+        self.exchange = exchange
+        self.routing_key = routing_key
+        self.properties = properties
+        self.body = body
+        self.published = published
+        self.redelivered = False
+
+
+class _Consumer:
+    __slots__ = ('channel', 'tag', 'queue', 'no_ack')
+
+    def __init__(self, channel, tag, queue, no_ack):
+        self.channel = channel
+        self.tag = tag
+        self.queue = queue
+        self.no_ack = no_ack
+
+
+class StandinBroker:
+    def __init__(self, host='127.0.0.1', port=0, rpc_latency=0.0, nack_every=0):
+        self.host = host
+        self.port = port
+        self.rpc_latency = rpc_latency
+        self.nack_every = nack_every
+        self.exchanges = {'': 'direct'}
+        self.queues = {}
+        self.bindings = set()
+        self.messages = {}
+        self.rpc_count = 0
+        self.published = 0
+        self.delivered = 0
+        self.routed = 0
+        self.unroutable = 0
+        self.nacked = 0
+        self.enqueued = defaultdict(int)
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+        self.timeline = []
+        self._sample_interval = 0.0
+        self._stats_start = None
+        self._consumers = {}
+        self._names = itertools.count(1)
+        self._loop = None
+        self._server = None
+        self._started = threading.Event()
+        # Optionele hook per gerouteerd bericht: on_route(message, queue_names)
+        self.on_route = None
+
+    def start(self):
+        """Start de broker op een achtergrondthread en geef de poort terug"""
+        threading.Thread(target=self._run, name='amqp-standin', daemon=True).start()
+        self._started.wait()
+        return self.port
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def call(self, function, *args):
+        """Voer function uit op de loop van de broker en geef het resultaat terug (vanaf een andere thread)"""
+        async def run():
+            return function(*args)
+        return asyncio.run_coroutine_threadsafe(run(), self._loop).result()
+
+    def depths(self):
+        return {name: len(messages) for name, messages in self.messages.items()}
+
+    def start_sampling(self, interval):
+        """Leg elke interval seconden de queuedieptes vast in timeline (op de loop aanroepen)"""
+        self._sample_interval = interval
+        self._stats_start = self._loop.time()
+        self._loop.call_later(interval, self._sample)
+
+    def _sample(self):
+        depths = {name: depth for name, depth in self.depths().items() if depth}
+        self.timeline.append((self._loop.time() - self._stats_start, self.published, self.delivered, depths))
+        self._loop.call_later(self._sample_interval, self._sample)
+
+    def reset_stats(self):
+        """Tellers, latencies en timeline op nul, bv. na het opzetten van de topologie"""
+        self.published = self.delivered = self.routed = self.unroutable = self.nacked = 0
+        self.enqueued.clear()
+        self.latencies.clear()
+        self.timeline = []
+        self._stats_start = self._loop.time()
+
+    def stats(self):
+        """Momentopname van tellers, dieptes, latency-percentielen (ms) en timeline"""
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        return {
+            'elapsed': self._loop.time() - (self._stats_start or self._loop.time()),
+            'published': self.published,
+            'routed': self.routed,
+            'delivered': self.delivered,
+            'unroutable': self.unroutable,
+            'nacked': self.nacked,
+            'enqueued': dict(self.enqueued),
+            'depths': self.depths(),
+            'latency': _percentiles(all_latencies),
+            'queue_latency': {queue: _percentiles(values) for queue, values in self.latencies.items()},
+            'timeline': list(self.timeline),
+        }
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._serve, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            self._loop.close()
+
+    async def _serve(self, reader, writer):
+        await _Connection(self, reader, writer).run()
+
+    # Topologie-operaties; gooien ChannelError zoals RabbitMQ het kanaal zou sluiten
+
+    def declare_exchange(self, method):
+        existing = self.exchanges.get(method.exchange)
+        if method.passive:
+            if existing is None:
+                raise ChannelError(404, f"NOT_FOUND - no exchange '{method.exchange}'")
+            return
+        if existing is not None and existing != method.type:
+            raise ChannelError(406, f"PRECONDITION_FAILED - inequivalent arg 'type' for exchange "
+                                    f"'{method.exchange}': received '{method.type}' but current is '{existing}'")
+        self.exchanges[method.exchange] = method.type
+
+    def delete_exchange(self, method):
+        self.exchanges.pop(method.exchange, None)
+        self.bindings = {binding for binding in self.bindings if binding[0] != method.exchange}
+
+    def declare_queue(self, method):
+        name = method.queue or f'amq.gen-{next(self._names)}'
+        existing = self.queues.get(name)
+        if method.passive:
+            if existing is None:
+                raise ChannelError(404, f"NOT_FOUND - no queue '{name}'")
+            return name
+        settings = {'durable': method.durable, 'arguments': method.arguments or {}}
+        if existing is not None and existing != settings:
+            raise ChannelError(406, f"PRECONDITION_FAILED - inequivalent arguments for queue '{name}'")
+        self.queues[name] = settings
+        self.messages.setdefault(name, deque())
+        self._consumers.setdefault(name, deque())
+        return name
+
+    def delete_queue(self, method):
+        self.queues.pop(method.queue, None)
+        count = len(self.messages.pop(method.queue, ()))
+        for consumer in self._consumers.pop(method.queue, ()):
+            consumer.channel.consumers.pop(consumer.tag, None)
+        self.bindings = {binding for binding in self.bindings if binding[1] != method.queue}
+        return count
+
+    def bind_queue(self, method):
+        if method.exchange not in self.exchanges:
+            raise ChannelError(404, f"NOT_FOUND - no exchange '{method.exchange}'")
+        if method.queue not in self.queues:
+            raise ChannelError(404, f"NOT_FOUND - no queue '{method.queue}'")
+        self.bindings.add((method.exchange, method.queue, method.routing_key))
+
+    def unbind_queue(self, method):
+        self.bindings.discard((method.exchange, method.queue, method.routing_key))
+
+    # Berichten
+
+    def route(self, exchange, routing_key):
+        """Namen van de queues waar een bericht met deze exchange en routing key terechtkomt"""
+        kind = self.exchanges.get(exchange)
+        if kind is None:
+            raise ChannelError(404, f"NOT_FOUND - no exchange '{exchange}'")
+        if exchange == '':
+            return [routing_key] if routing_key in self.queues else []
+        queues = set()
+        for source, queue, key in self.bindings:
+            if source != exchange:
+                continue
+            if kind == 'fanout' or (kind == 'topic' and topic_matches(key, routing_key)) or key == routing_key:
+                queues.add(queue)
+        return sorted(queues)
+
+    def publish(self, message):
+        self.published += 1
+        queues = self.route(message.exchange, message.routing_key)
+        if self.on_route is not None:
+            self.on_route(message, queues)
+        if not queues:
+            self.unroutable += 1
+        for queue in queues:
+            self.routed += 1
+            self.enqueued[queue] += 1
+            self.messages[queue].append(message)
+            self.dispatch(queue)
+        return queues
+
+    def consume(self, consumer):
+        if consumer.queue not in self.queues:
+            raise ChannelError(404, f"NOT_FOUND - no queue '{consumer.queue}'")
+        self._consumers[consumer.queue].append(consumer)
+        self.dispatch(consumer.queue)
+
+    def cancel(self, consumer):
+        consumers = self._consumers.get(consumer.queue)
+        if consumers is not None and consumer in consumers:
+            consumers.remove(consumer)
+
+    def requeue(self, queue, messages):
+        """Zet niet-bevestigde berichten terug vooraan de queue"""
+        pending = self.messages.get(queue)
+        if pending is None:
+            return
+        for message in reversed(messages):
+            message.redelivered = True
+            pending.appendleft(message)
+        self.dispatch(queue)
+
+    def dispatch(self, queue):
+        """Lever berichten af aan de consumers van de queue, round-robin en binnen hun prefetch"""
+        pending = self.messages.get(queue)
+        consumers = self._consumers.get(queue)
+        if not pending or not consumers:
+            return
+        idle = 0
+        while pending and idle < len(consumers):
+            consumer = consumers[0]
+            consumers.rotate(-1)
+            if not consumer.channel.can_deliver():
+                idle += 1
+                continue
+            idle = 0
+            self.delivered += 1
+            message = pending.popleft()
+            if not message.redelivered:
+                self.latencies[queue].append(self._loop.time() - message.published)
+            consumer.channel.deliver(consumer, message)
+
+
+class _Channel:
+    def __init__(self, connection, number):
+        self.connection = connection
+        self.number = number
+        self.queue = asyncio.Queue()
+        self.prefetch = 0
+        self.consumers = {}
+        self.unacked = {}
+        self.delivery_tags = itertools.count(1)
+        self.confirm = False
+        self.publish_tags = itertools.count(1)
+        self.unconfirmed = None
+
+    def can_deliver(self):
+        return not self.prefetch or len(self.unacked) < self.prefetch
+
+    def deliver(self, consumer, message):
+        tag = next(self.delivery_tags)
+        if not consumer.no_ack:
+            self.unacked[tag] = (consumer.queue, message)
+        self.connection.send_content(
+            self.number,
+            spec.Basic.Deliver(consumer.tag, tag, message.redelivered, message.exchange, message.routing_key),
+            message.properties, message.body,
+        )
+
+    def settle(self, delivery_tag, multiple):
+        """Haal bevestigde deliveries uit unacked en geef ze terug (per queue op volgorde)"""
+        if multiple:
+            tags = [tag for tag in self.unacked if tag <= delivery_tag] if delivery_tag else list(self.unacked)
+        else:
+            tags = [delivery_tag] if delivery_tag in self.unacked else []
+        if delivery_tag and delivery_tag not in self.unacked:
+            # Zoals RabbitMQ, ook bij multiple: de tag zelf moet nog openstaan
+            raise ChannelError(406, f"PRECONDITION_FAILED - unknown delivery tag {delivery_tag}")
+        return [self.unacked.pop(tag) for tag in tags]
+
+    def close(self, broker):
+        """Kanaal weg: consumers stoppen en niet-bevestigde berichten terugzetten"""
+        for consumer in self.consumers.values():
+            broker.cancel(consumer)
+        self.consumers.clear()
+        by_queue = {}
+        for queue, message in self.unacked.values():
+            by_queue.setdefault(queue, []).append(message)
+        self.unacked.clear()
+        for queue, messages in by_queue.items():
+            broker.requeue(queue, messages)
+
+
+class _Connection:
+    def __init__(self, broker, reader, writer):
+        self._broker = broker
+        self._reader = reader
+        self._writer = writer
+        self._channels = {}
+        self._closing = set()
+        self._consumer_tags = itertools.count(1)
+
+    def send(self, channel_number, method):
+        self._writer.write(pika.frame.Method(channel_number, method).marshal())
+
+    def send_content(self, channel_number, method, properties, body):
+        frames = [pika.frame.Method(channel_number, method).marshal(),
+                  pika.frame.Header(channel_number, len(body), properties).marshal()]
+        size = FRAME_MAX - 8
+        for offset in range(0, len(body), size):
+            frames.append(pika.frame.Body(channel_number, body[offset:offset + size]).marshal())
+        self._writer.write(b''.join(frames))
+
+    async def run(self):
+        data = b''
+        try:
+            while True:
+                chunk = await self._reader.read(262144)
+                if not chunk:
+                    break
+                data += chunk
+                offset = 0
+                while offset < len(data):
+                    # Alleen het frame zelf naar de decoder, niet de hele buffer kopiëren
+                    if data.startswith(b'AMQP', offset):
+                        end = offset + 8
+                    elif len(data) - offset >= 7:
+                        end = offset + 8 + struct.unpack_from('>I', data, offset + 3)[0]
+                    else:
+                        break
+                    if end > len(data):
+                        break
+                    consumed, frame = pika.frame.decode_frame(data[offset:end])
+                    if frame is None:
+                        break
+                    offset += consumed
+                    if not self._handle_frame(frame):
+                        await self._writer.drain()
+                        return
+                data = data[offset:]
+                await self._writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for channel in self._channels.values():
+                channel.queue.put_nowait(None)
+                channel.close(self._broker)
+            self._channels.clear()
+            self._writer.close()
+
+    def _handle_frame(self, frame):
+        if isinstance(frame, pika.frame.ProtocolHeader):
+            self.send(0, spec.Connection.Start(server_properties=SERVER_PROPERTIES))
+            return True
+        if isinstance(frame, pika.frame.Heartbeat):
+            return True
+        if frame.channel_number == 0:
+            return self._handle_connection(frame.method)
+
+        number = frame.channel_number
+        if isinstance(frame, pika.frame.Method) and isinstance(frame.method, spec.Channel.Open):
+            channel = _Channel(self, number)
+            self._channels[number] = channel
+            asyncio.ensure_future(self._channel_worker(channel))
+        elif isinstance(frame, pika.frame.Method) and isinstance(frame.method, spec.Channel.CloseOk):
+            self._closing.discard(number)
+            return True
+        if number in self._closing or number not in self._channels:
+            # Na een kanaalfout negeert de broker alles tot Channel.CloseOk
+            return True
+        self._channels[number].queue.put_nowait(frame)
+        return True
+
+    def _handle_connection(self, method):
+        if isinstance(method, spec.Connection.StartOk):
+            self.send(0, spec.Connection.Tune(channel_max=2047, frame_max=FRAME_MAX, heartbeat=0))
+        elif isinstance(method, spec.Connection.Open):
+            self.send(0, spec.Connection.OpenOk())
+        elif isinstance(method, spec.Connection.Close):
+            self.send(0, spec.Connection.CloseOk())
+            return False
+        elif isinstance(method, spec.Connection.CloseOk):
+            return False
+        return True
+
+    async def _read_content(self, channel):
+        """Lees de header- en body-frames die bij een Basic.Publish horen"""
+        header = await channel.queue.get()
+        if header is None:
+            return None, None
+        parts = []
+        received = 0
+        while received < header.body_size:
+            frame = await channel.queue.get()
+            if frame is None:
+                return None, None
+            parts.append(frame.fragment)
+            received += len(frame.fragment)
+        return header.properties, b''.join(parts)
+
+    async def _channel_worker(self, channel):
+        loop = asyncio.get_event_loop()
+        while True:
+            frame = await channel.queue.get()
+            if frame is None:
+                return
+            if not isinstance(frame, pika.frame.Method):
+                continue
+            method = frame.method
+            try:
+                if isinstance(method, spec.Basic.Publish):
+                    properties, body = await self._read_content(channel)
+                    if properties is None:
+                        return
+                    self._publish(channel, method, properties, body, loop.time())
+                    if channel.unconfirmed is not None and channel.queue.empty():
+                        # Confirms gebundeld zoals RabbitMQ: één multiple-ack per reeks publicaties
+                        self.send(channel.number, spec.Basic.Ack(delivery_tag=channel.unconfirmed, multiple=True))
+                        channel.unconfirmed = None
+                    continue
+                reply = await self._call(channel, method)
+            except ChannelError as e:
+                self.send(channel.number, spec.Channel.Close(e.reply_code, e.reply_text,
+                                                             method.INDEX >> 16, method.INDEX & 0xffff))
+                self._closing.add(channel.number)
+                self._channels.pop(channel.number, None)
+                channel.close(self._broker)
+                return
+            if isinstance(method, spec.Channel.Close):
+                self.send(channel.number, spec.Channel.CloseOk())
+                self._channels.pop(channel.number, None)
+                channel.close(self._broker)
+                return
+            if reply is not None and not getattr(method, 'nowait', False):
+                self.send(channel.number, reply)
+
+    def _publish(self, channel, method, properties, body, now):
+        broker = self._broker
+        message = Message(method.exchange, method.routing_key, properties, body, now)
+        tag = next(channel.publish_tags) if channel.confirm else None
+        if tag is not None and broker.nack_every and tag % broker.nack_every == 0:
+            # Geweigerd zonder te routeren; openstaande confirms eerst, zodat de volgorde klopt
+            if channel.unconfirmed is not None:
+                self.send(channel.number, spec.Basic.Ack(delivery_tag=channel.unconfirmed, multiple=True))
+                channel.unconfirmed = None
+            self.send(channel.number, spec.Basic.Nack(delivery_tag=tag, multiple=False, requeue=False))
+            broker.nacked += 1
+            return
+        queues = broker.publish(message)
+        if not queues and method.mandatory:
+            self.send_content(channel.number, spec.Basic.Return(312, 'NO_ROUTE', method.exchange, method.routing_key),
+                              properties, body)
+        if tag is not None:
+            channel.unconfirmed = tag
+
+    async def _call(self, channel, method):
+        broker = self._broker
+        if method.synchronous:
+            broker.rpc_count += 1
+            if broker.rpc_latency:
+                await asyncio.sleep(broker.rpc_latency)
+
+        if isinstance(method, spec.Basic.Ack):
+            channel.settle(method.delivery_tag, method.multiple)
+            self._redispatch(channel)
+            return None
+        if isinstance(method, (spec.Basic.Nack, spec.Basic.Reject)):
+            settled = channel.settle(method.delivery_tag, getattr(method, 'multiple', False))
+            if method.requeue:
+                by_queue = {}
+                for queue, message in settled:
+                    by_queue.setdefault(queue, []).append(message)
+                for queue, messages in by_queue.items():
+                    broker.requeue(queue, messages)
+            self._redispatch(channel)
+            return None
+        if isinstance(method, spec.Channel.Open):
+            return spec.Channel.OpenOk()
+        if isinstance(method, spec.Channel.Close):
+            return None
+        if isinstance(method, spec.Basic.Qos):
+            channel.prefetch = method.prefetch_count
+            return spec.Basic.QosOk()
+        if isinstance(method, spec.Confirm.Select):
+            channel.confirm = True
+            return spec.Confirm.SelectOk()
+        if isinstance(method, spec.Basic.Consume):
+            tag = method.consumer_tag or f'amq.ctag-{next(self._consumer_tags)}'
+            consumer = _Consumer(channel, tag, method.queue, method.no_ack)
+            if method.queue not in broker.queues:
+                raise ChannelError(404, f"NOT_FOUND - no queue '{method.queue}'")
+            channel.consumers[tag] = consumer
+            if not method.nowait:
+                self.send(channel.number, spec.Basic.ConsumeOk(tag))
+            broker.consume(consumer)
+            return None
+        if isinstance(method, spec.Basic.Cancel):
+            consumer = channel.consumers.pop(method.consumer_tag, None)
+            if consumer is not None:
+                broker.cancel(consumer)
+            return spec.Basic.CancelOk(method.consumer_tag)
+        if isinstance(method, spec.Exchange.Declare):
+            broker.declare_exchange(method)
+            return spec.Exchange.DeclareOk()
+        if isinstance(method, spec.Exchange.Delete):
+            broker.delete_exchange(method)
+            return spec.Exchange.DeleteOk()
+        if isinstance(method, spec.Queue.Declare):
+            name = broker.declare_queue(method)
+            return spec.Queue.DeclareOk(name, len(broker.messages[name]), len(broker._consumers[name]))
+        if isinstance(method, spec.Queue.Delete):
+            return spec.Queue.DeleteOk(broker.delete_queue(method))
+        if isinstance(method, spec.Queue.Purge):
+            count = len(broker.messages.get(method.queue, ()))
+            broker.messages.get(method.queue, deque()).clear()
+            return spec.Queue.PurgeOk(count)
+        if isinstance(method, spec.Queue.Bind):
+            broker.bind_queue(method)
+            return spec.Queue.BindOk()
+        if isinstance(method, spec.Queue.Unbind):
+            broker.unbind_queue(method)
+            return spec.Queue.UnbindOk()
+        raise ChannelError(540, f"NOT_IMPLEMENTED - {method.NAME}")
+
+    def _redispatch(self, channel):
+        """Na een ack heeft het kanaal weer ruimte binnen zijn prefetch"""
+        for queue in {consumer.queue for consumer in channel.consumers.values()}:
+            self._broker.dispatch(queue)
+
+
+def _percentiles(values):
+    """count, p50, p95, p99 en max in milliseconden"""
+    if not values:
+        return {'count': 0}
+    values = sorted(values)
+    last = len(values) - 1
+    return {
+        'count': len(values),
+        'p50': values[last // 2] * 1000,
+        'p95': values[int(last * 0.95)] * 1000,
+        'p99': values[int(last * 0.99)] * 1000,
+        'max': values[last] * 1000,
+    }
+
+
+def _serve_in_process(connection, rpc_latency, sample_interval, nack_every):
+    broker = StandinBroker(rpc_latency=rpc_latency, nack_every=nack_every)
+    connection.send(broker.start())
+    if sample_interval:
+        broker.call(broker.start_sampling, sample_interval)
+    # Opdrachten van het hoofdproces: 'stats' of 'reset'
+    while True:
+        try:
+            command = connection.recv()
+        except EOFError:
+            # Geen stats meer nodig (bv. via start_process): de broker blijft gewoon draaien
+            threading.Event().wait()
+        if command == 'stats':
+            connection.send(broker.call(broker.stats))
+        elif command == 'reset':
+            connection.send(broker.call(broker.reset_stats))
+
+
+class BrokerProcess:
+    """De broker in een eigen proces (geen GIL-concurrentie met de client), met stats via een pipe"""
+
+    def __init__(self, rpc_latency=0.0, sample_interval=0.0, nack_every=0):
+        import multiprocessing
+        self._connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve_in_process,
+                                               args=(child, rpc_latency, sample_interval, nack_every), daemon=True)
+        self.process.start()
+        self.port = self._connection.recv()
+
+    def stats(self):
+        self._connection.send('stats')
+        return self._connection.recv()
+
+    def reset_stats(self):
+        self._connection.send('reset')
+        self._connection.recv()
+
+    def terminate(self):
+        self.process.terminate()
+        self.process.join()
+
+
+def start_process(rpc_latency=0.0, nack_every=0):
+    """Start de broker in een eigen proces; geeft (proces, poort)"""
+    broker = BrokerProcess(rpc_latency, nack_every=nack_every)
+    return broker.process, broker.port
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Lokale AMQP stand-in broker')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5672)
+    parser.add_argument('--latency', type=float, default=0.0, help='vertraging per synchrone RPC in seconden')
+    parser.add_argument('--nack-every', type=int, default=0, help='weiger elke n-de bevestigde publicatie (0 = nooit)')
+    args = parser.parse_args()
+    broker = StandinBroker(args.host, args.port, args.latency, args.nack_every)
+    print(f"AMQP stand-in luistert op {args.host}:{broker.start()}")
+    threading.Event().wait()
@@ -0,0 +1,94 @@
+"""Micro-benchmark: heartbeat-verwerking van de aggregator op één core, zonder broker.
+
+Meet parse + index-update per heartbeat (beide formaten) en de kosten van het aflopen van
+timeouts: timing wheel tegenover elke tick alle senders langslopen.
+
+Gebruik: python bench_aggregator.py [senders] [heartbeats]
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'heartbeat'))
+
+from aggregator import LivenessIndex, parse_timestamp  # noqa: E402
+from heartbeat_xml import parse_heartbeat, render_heartbeat, render_heartbeats  # noqa: E402
+from timing_wheel import TimingWheel  # noqa: E402
+
+TIMEOUT = 5.0
+TICK = 0.1
+
+
+def process(index, body, now, wall):
+    """Zelfde werk als HeartbeatAggregator._on_message, zonder AMQP"""
+    timestamp, senders, kind = parse_heartbeat(body)
+    sent = parse_timestamp(timestamp)
+    seen_at = now - max(0.0, wall - sent) if sent is not None else now
+    for sender, status in senders:
+        index.seen(sender, status, seen_at, summary=kind != 'heartbeat')
+
+
+def scan_expired(last_seen, silent, now):
+    """Het alternatief zonder wheel: elke tick alle senders langs"""
+    expired = []
+    for sender, seen in last_seen.items():
+        if sender not in silent and seen + TIMEOUT <= now:
+            silent.add(sender)
+            expired.append(sender)
+    return expired
+
+
+def main():
+    sender_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    heartbeat_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    senders = [f'attendify-frontend-service-{i}' for i in range(sender_count)]
+    timestamp = datetime.utcnow().isoformat() + 'Z'
+    single = [render_heartbeat(sender, timestamp) for sender in senders]
+    summary = render_heartbeats([(sender, 'UP') for sender in senders[:100]], timestamp)
+
+    index = LivenessIndex(TIMEOUT, TimingWheel(tick=TICK, size=512))
+    bodies = [single[i % sender_count] for i in range(heartbeat_count)]
+    start = time.perf_counter()
+    now, wall = time.monotonic(), time.time()
+    for i, body in enumerate(bodies):
+        if i % 1000 == 0:
+            now, wall = time.monotonic(), time.time()
+        process(index, body, now, wall)
+    elapsed = time.perf_counter() - start
+    print(f"<heartbeat>:  {heartbeat_count} in {elapsed:.2f} s = {heartbeat_count / elapsed:,.0f}/s")
+
+    rounds = max(1, heartbeat_count // 100)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        process(index, summary, now, wall)
+    elapsed = time.perf_counter() - start
+    print(f"<heartbeats>: {rounds} x 100 senders in {elapsed:.2f} s = {rounds * 100 / elapsed:,.0f} senders/s")
+
+    # Een gesimuleerde minuut met 10 ticks per seconde: alle senders blijven leven,
+    # behalve 1% dat na de eerste seconde stil valt
+    base = time.monotonic()
+    quiet = set(senders[::100])
+    wheel_index = LivenessIndex(TIMEOUT, TimingWheel(tick=TICK, size=512, clock=lambda: base))
+    last_seen, silent = {}, set()
+    wheel_time = scan_time = 0.0
+    wheel_expired = scan_expired_count = 0
+    for step in range(1, 601):
+        now = base + step * TICK
+        if step % 10 == 0:
+            for sender in senders:
+                if sender not in quiet or step <= 10:
+                    wheel_index.seen(sender, 'UP', now)
+                    last_seen[sender] = now
+        start = time.perf_counter()
+        wheel_expired += len(wheel_index.expire(now))
+        wheel_time += time.perf_counter() - start
+        start = time.perf_counter()
+        scan_expired_count += len(scan_expired(last_seen, silent, now))
+        scan_time += time.perf_counter() - start
+    print(f"timeouts over 600 ticks: wheel {wheel_time * 1000:.1f} ms ({wheel_expired} verlopen), "
+          f"scan {scan_time * 1000:.1f} ms ({scan_expired_count} verlopen)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+"""Load-test van de messaging-laag tegen de lokale stand-ins, zonder RabbitMQ, Docker of netwerk.
+
+Zet de topologie op zoals configure.py dat doet (build_operations + PipelinedProvisioner)
+en start dan, elk in een eigen proces:
+
+- synthetische producers die de routes uit analyze.py publiceren: elke letterlijke binding
+  key, of de routes en rates uit een --profile;
+- consumers op alle queues (prefetch, multiple-acks);
+- heartbeat.py zelf, met RABBITMQ_HOSTNAME/RABBITMQ_AMQP_PORT op de stand-in en
+  HEARTBEAT_DOCKER_SOCKET op een nep-Docker met --heartbeat-containers containers.
+
+Het rapport geeft de publish-throughput, de routeringslatency (van publish bij de broker
+tot aflevering aan een consumer) en de queuediepte door de tijd. Met --min-rate en
+--max-p99 eindigt de run met exit 1 bij een regressie, voor CI. Draait heartbeat.py mee,
+dan faalt de run ook als dat proces onderweg stopt of minder dan --min-heartbeat-ratio
+van de verwachte heartbeats (containers x duur / interval) aflevert.
+
+    python3 bench_load.py --duration 20 --producers 2 --rate 2000
+    python3 bench_load.py --profile rates.json --heartbeat-containers 500 --json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import pika
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'topology'))
+
+from amqp_standin import BrokerProcess  # noqa: E402
+from analyze import Analyzer, dead_letter_exchanges, load_profile  # noqa: E402
+from async_provision import PipelinedProvisioner  # noqa: E402
+from configure import TOPOLOGY_FILE, build_operations  # noqa: E402
+from docker_standin import DockerStandin  # noqa: E402
+from topology import Topology, load_topology, plan  # noqa: E402
+
+HEARTBEAT_SCRIPT = os.path.join(HERE, '..', 'heartbeat', 'heartbeat.py')
+HEARTBEAT_QUEUE = 'monitoring.heartbeat'
+# Routing keys die heartbeat.py zelf publiceert; zonder profiel laten de producers die aan heartbeat
+HEARTBEAT_ROUTES = {('monitoring', 'monitoring.heartbeat'), ('monitoring', 'monitoring.stats')}
+# Na de run krijgen de consumers nog zo lang om de queues leeg te halen
+DRAIN_TIMEOUT = 10.0
+
+
+def _parameters(port):
+    return pika.ConnectionParameters('127.0.0.1', port, '/', pika.PlainCredentials('guest', 'guest'))
+
+
+def run_producer(port, routes, rate, duration, seed, results):
+    """Publiceer routes (gewogen naar hun rate) met rate berichten/s in totaal; 0 = zo snel mogelijk"""
+    logging.getLogger('pika').setLevel(logging.WARNING)
+    connection = pika.BlockingConnection(_parameters(port))
+    channel = connection.channel()
+    properties = pika.BasicProperties(delivery_mode=2)
+    bodies = {size: b'x' * size for size in {route.size for route in routes}}
+    picks = random.Random(seed).choices(routes, weights=[route.rate for route in routes], k=10000)
+
+    published = 0
+    start = time.monotonic()
+    end = start + duration
+    while True:
+        now = time.monotonic()
+        if now >= end:
+            break
+        if rate:
+            ahead = published - (now - start) * rate
+            if ahead > 0:
+                time.sleep(min(ahead / rate, end - now))
+                continue
+        for route in picks[published % len(picks):published % len(picks) + 100]:
+            channel.basic_publish(route.exchange, route.routing_key, bodies[route.size], properties)
+            published += 1
+    # Alles wat nog in de buffer zit naar de broker voordat de tijd stopt
+    connection.process_data_events(0)
+    elapsed = time.monotonic() - start
+    connection.close()
+    results.put((published, elapsed))
+
+
+class _Consumer:
+    """Consumeert een groep queues op één kanaal en ackt per batch"""
+
+    def __init__(self, port, queues, prefetch):
+        self._queues = queues
+        self._prefetch = prefetch
+        self._unacked = 0
+        self._last_tag = None
+        self._channel = None
+        self._connection = pika.SelectConnection(_parameters(port), on_open_callback=self._on_open)
+
+    def run(self):
+        self._connection.ioloop.start()
+
+    def _on_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_channel_open(self, channel):
+        self._channel = channel
+        channel.basic_qos(prefetch_count=self._prefetch, callback=self._on_qos)
+
+    def _on_qos(self, frame):
+        for queue in self._queues:
+            self._channel.basic_consume(queue, self._on_message)
+        self._connection.ioloop.call_later(0.1, self._on_timer)
+
+    def _on_message(self, channel, method, properties, body):
+        self._last_tag = method.delivery_tag
+        self._unacked += 1
+        if self._unacked >= self._prefetch // 2:
+            self._ack()
+
+    def _ack(self):
+        if self._unacked:
+            self._channel.basic_ack(self._last_tag, multiple=True)
+            self._unacked = 0
+
+    def _on_timer(self):
+        self._ack()
+        self._connection.ioloop.call_later(0.1, self._on_timer)
+
+
+def run_consumer(port, queues, prefetch):
+    logging.getLogger('pika').setLevel(logging.WARNING)
+    _Consumer(port, queues, prefetch).run()
+
+
+def start_heartbeat(port, socket_path, interval, resources, log):
+    env = dict(
+        os.environ,
+        RABBITMQ_HOSTNAME='127.0.0.1',
+        RABBITMQ_AMQP_PORT=str(port),
+        HEARTBEAT_DOCKER_SOCKET=socket_path,
+        HEARTBEAT_DISCOVERY='compose',
+        HEARTBEAT_COMPOSE_PROJECT='loadtest',
+        HEARTBEAT_INTERVAL=str(interval),
+        HEARTBEAT_RESOURCE_INTERVAL=str(resources),
+        HEARTBEAT_METRICS_PORT='0',
+        HEARTBEAT_STATS_INTERVAL='0',
+    )
+    return subprocess.Popen([sys.executable, HEARTBEAT_SCRIPT], cwd=os.path.dirname(HEARTBEAT_SCRIPT),
+                            env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_for_drain(broker, timeout):
+    """Wacht tot alle queues met consumers leeg zijn of niet meer krimpen"""
+    deadline = time.monotonic() + timeout
+    previous = None
+    while time.monotonic() < deadline:
+        depth = sum(broker.stats()['depths'].values())
+        if depth == 0 or depth == previous:
+            return
+        previous = depth
+        time.sleep(0.5)
+
+
+def describe(result, top=10):
+    """Het rapport als tekstregels"""
+    producers, broker = result['producers'], result['broker']
+    lines = [
+        f"Producers: {producers['published']} berichten in {producers['duration']:.1f} s = "
+        f"{producers['rate']:.0f}/s ({producers['processes']} processen, {producers['routes']} routes)",
+    ]
+    elapsed = broker['elapsed'] or 1.0
+    fanout = broker['routed'] / broker['published'] if broker['published'] else 0.0
+    lines.append(f"Broker over {elapsed:.1f} s (incl. leeglopen): {broker['published'] / elapsed:.0f} publish/s, "
+                 f"{broker['routed'] / elapsed:.0f} "
+                 f"gerouteerd/s (fan-out x{fanout:.1f}), {broker['delivered'] / elapsed:.0f} afgeleverd/s, "
+                 f"{broker['unroutable']} onrouteerbaar")
+    heartbeat = result.get('heartbeat')
+    if heartbeat:
+        lines.append(f"Heartbeat: {heartbeat['containers']} containers, {heartbeat['messages']} heartbeats "
+                     f"({heartbeat['messages'] / elapsed:.0f}/s, verwacht {heartbeat['expected']:.0f}), "
+                     f"{heartbeat['docker_requests']} Docker-calls")
+        if heartbeat['exit_code'] is not None:
+            lines.append(f"Heartbeat gestopt met exit {heartbeat['exit_code']}, zie {heartbeat['log']}")
+
+    latency = broker['latency']
+    if latency['count']:
+        lines.append(f"Routeringslatency over {latency['count']} afleveringen: p50 {latency['p50']:.2f} ms, "
+                     f"p95 {latency['p95']:.2f} ms, p99 {latency['p99']:.2f} ms, max {latency['max']:.2f} ms")
+        slowest = sorted(broker['queue_latency'].items(), key=lambda item: -item[1].get('p99', 0))[:top]
+        lines += ['', 'Traagste queues (p99):']
+        lines += [f"  {queue:<24} {stats['count']:>8}  p50 {stats['p50']:>8.2f} ms  p99 {stats['p99']:>8.2f} ms"
+                  for queue, stats in slowest]
+
+    if broker['timeline']:
+        lines += ['', 'Queuediepte door de tijd:', '   t (s)   publish/s  afgeleverd/s   diepte  grootste queue']
+        previous = (0.0, 0, 0)
+        for t, published, delivered, depths in broker['timeline']:
+            span = (t - previous[0]) or 1.0
+            biggest = max(depths.items(), key=lambda item: item[1]) if depths else ('-', 0)
+            lines.append(f"  {t:6.1f}  {(published - previous[1]) / span:10.0f}  {(delivered - previous[2]) / span:12.0f}"
+                         f"  {sum(depths.values()):7}  {biggest[0]} ({biggest[1]})")
+            previous = (t, published, delivered)
+
+    remaining = {queue: depth for queue, depth in broker['depths'].items() if depth}
+    if remaining:
+        lines += ['', f"Niet leeg na de run: {remaining}"]
+    return lines
+
+
+def check(result, min_rate, max_p99, min_heartbeat_ratio=0.0):
+    """Regressies ten opzichte van de drempels, als lijst meldingen"""
+    failures = []
+    heartbeat = result.get('heartbeat')
+    if heartbeat:
+        if heartbeat['exit_code'] is not None:
+            failures.append(f"heartbeat.py stopte tijdens de run met exit {heartbeat['exit_code']}")
+        if heartbeat['messages'] < min_heartbeat_ratio * heartbeat['expected']:
+            failures.append(f"heartbeats {heartbeat['messages']} < {min_heartbeat_ratio:.0%} "
+                            f"van verwacht {heartbeat['expected']:.0f}")
+    if min_rate and result['producers']['rate'] < min_rate:
+        failures.append(f"publish-throughput {result['producers']['rate']:.0f}/s < {min_rate:.0f}/s")
+    p99 = result['broker']['latency'].get('p99')
+    if max_p99 and p99 is not None and p99 > max_p99:
+        failures.append(f"p99-latency {p99:.2f} ms > {max_p99:.2f} ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--file', default=TOPOLOGY_FILE, help='topologiebestand (standaard topology.json)')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconden publiceren')
+    parser.add_argument('--producers', type=int, default=2, help='aantal producer-processen')
+    parser.add_argument('--rate', type=float, default=1000.0, help='berichten/s per producer (0 = zo snel mogelijk)')
+    parser.add_argument('--profile', help='routes en gewichten uit een analyze.py-profiel')
+    parser.add_argument('--size', type=int, default=1024, help='berichtgrootte zonder profiel')
+    parser.add_argument('--consumers', type=int, default=2, help='aantal consumer-processen (0 = niet consumeren)')
+    parser.add_argument('--prefetch', type=int, default=1000)
+    parser.add_argument('--heartbeat-containers', type=int, default=100,
+                        help='containers voor heartbeat.py (0 = heartbeat niet starten)')
+    parser.add_argument('--heartbeat-interval', type=float, default=1.0)
+    parser.add_argument('--heartbeat-resources', type=float, default=0.0,
+                        help='HEARTBEAT_RESOURCE_INTERVAL: stats streams en monitoring.stats (0 = uit)')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='interval van de dieptemeting')
+    parser.add_argument('--min-rate', type=float, default=0.0, help='faal onder deze publish-throughput (berichten/s)')
+    parser.add_argument('--max-p99', type=float, default=0.0, help='faal boven deze p99-latency (ms)')
+    parser.add_argument('--min-heartbeat-ratio', type=float, default=0.8,
+                        help='faal onder dit deel van de verwachte heartbeats (0 = niet controleren)')
+    parser.add_argument('--json', action='store_true', help='resultaat als JSON')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    logging.getLogger('pika').setLevel(logging.WARNING)
+
+    broker = BrokerProcess(sample_interval=args.sample_interval)
+    desired = load_topology(args.file)
+    PipelinedProvisioner(_parameters(broker.port)).run(build_operations(plan(desired, Topology()), desired))
+
+    analyzer = Analyzer(desired)
+    if args.profile:
+        routes = [route for route in load_profile(args.profile, args.size) if route.rate > 0]
+    else:
+        routes = analyzer.default_routes(size=args.size, exclude=dead_letter_exchanges(desired))
+        if args.heartbeat_containers:
+            routes = [route for route in routes if (route.exchange, route.routing_key) not in HEARTBEAT_ROUTES]
+
+    processes = []
+    heartbeat = docker = None
+    workdir = tempfile.mkdtemp(prefix='bench_load_')
+    try:
+        queues = sorted(desired.queues)
+        for index in range(args.consumers):
+            process = multiprocessing.Process(target=run_consumer, daemon=True,
+                                              args=(broker.port, queues[index::args.consumers], args.prefetch))
+            process.start()
+            processes.append(process)
+
+        if args.heartbeat_containers:
+            names = [f'loadtest-service-{i}' for i in range(args.heartbeat_containers)]
+            docker = DockerStandin(os.path.join(workdir, 'docker.sock'), names)
+            docker.start()
+            log = open(os.path.join(workdir, 'heartbeat.log'), 'wb')
+            heartbeat = start_heartbeat(broker.port, docker.path, args.heartbeat_interval, args.heartbeat_resources, log)
+            # Heartbeat de tijd geven om discovery te doen en te verbinden
+            time.sleep(2.0)
+
+        broker.reset_stats()
+        results = multiprocessing.Queue()
+        producers = [multiprocessing.Process(target=run_producer, daemon=True,
+                                             args=(broker.port, routes, args.rate, args.duration, index, results))
+                     for index in range(args.producers)]
+        for process in producers:
+            process.start()
+        counts = [results.get() for _ in producers]
+        for process in producers:
+            process.join()
+        if args.consumers:
+            wait_for_drain(broker, DRAIN_TIMEOUT)
+        stats = broker.stats()
+        # None zolang heartbeat.py nog draait; anders is het onderweg gestopt
+        heartbeat_exit = heartbeat.poll() if heartbeat is not None else None
+    finally:
+        if heartbeat is not None:
+            heartbeat.terminate()
+            heartbeat.wait()
+        if docker is not None:
+            docker.stop()
+        for process in processes:
+            process.terminate()
+        broker.terminate()
+
+    published = sum(count for count, _ in counts)
+    duration = max(elapsed for _, elapsed in counts) if counts else 0.0
+    result = {
+        'producers': {
+            'processes': args.producers,
+            'routes': len(routes),
+            'published': published,
+            'duration': duration,
+            'rate': published / duration if duration else 0.0,
+        },
+        'broker': stats,
+    }
+    if args.heartbeat_containers:
+        result['heartbeat'] = {
+            'containers': args.heartbeat_containers,
+            'messages': stats['enqueued'].get(HEARTBEAT_QUEUE, 0),
+            # Per-container modus: één heartbeat per container per interval, over de hele meting
+            'expected': args.heartbeat_containers * stats['elapsed'] / args.heartbeat_interval,
+            'exit_code': heartbeat_exit,
+            'docker_requests': docker.requests,
+            'log': os.path.join(workdir, 'heartbeat.log'),
+        }
+
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        print('\n'.join(describe(result)))
+
+    failures = check(result, args.min_rate, args.max_p99, args.min_heartbeat_ratio)
+    for failure in failures:
+        logging.error(f"Regressie: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Benchmark: volledige provisioning van topology.json, één-voor-één tegenover gepipelined.
+
+Draait tegen de lokale AMQP stand-in (amqp_standin.py) met een instelbare vertraging
+per RPC, zodat het verschil tussen wachten op elke round-trip en meerdere declaraties
+tegelijk onderweg zichtbaar wordt zonder RabbitMQ. Na elke run wordt gecontroleerd
+dat de broker precies de topologie uit het bestand bevat.
+
+    python3 bench_provision.py --latency 0.002 --channels 1 4 16 32
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import pika
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'topology'))
+
+from amqp_standin import StandinBroker  # noqa: E402
+from async_provision import PipelinedProvisioner  # noqa: E402
+from configure import TOPOLOGY_FILE, Provisioner, build_operations  # noqa: E402
+from topology import Topology, load_topology, plan  # noqa: E402
+
+
+def verify(broker, desired):
+    exchanges = {name: kind for name, kind in broker.exchanges.items() if name}
+    assert exchanges == {name: e.type for name, e in desired.exchanges.items()}, 'exchanges wijken af'
+    assert set(broker.queues) == set(desired.queues), 'queues wijken af'
+    assert broker.bindings == set(desired.bindings), 'bindings wijken af'
+
+
+def run(label, make_provisioner, phases, desired, latency):
+    broker = StandinBroker(rpc_latency=latency)
+    port = broker.start()
+    parameters = pika.ConnectionParameters('127.0.0.1', port, '/', pika.PlainCredentials('guest', 'guest'))
+    provisioner = make_provisioner(parameters)
+    start = time.perf_counter()
+    provisioner.run(phases)
+    elapsed = time.perf_counter() - start
+    broker.stop()
+    verify(broker, desired)
+    print(f"{label:<22} {elapsed * 1000:8.1f} ms  {provisioner.operations / elapsed:8.0f} ops/s  "
+          f"fouten={provisioner.failures}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark van topology provisioning')
+    parser.add_argument('--file', default=TOPOLOGY_FILE)
+    parser.add_argument('--latency', type=float, default=0.002, help='vertraging per RPC in seconden')
+    parser.add_argument('--channels', type=int, nargs='+', default=[1, 4, 16, 32])
+    args = parser.parse_args()
+    logging.getLogger('pika').setLevel(logging.WARNING)
+
+    desired = load_topology(args.file)
+    phases = build_operations(plan(desired, Topology()), desired)
+    operations = sum(len(phase) for phase in phases)
+    print(f"{operations} operaties, {args.latency * 1000:.1f} ms per RPC")
+
+    baseline = run('blocking', Provisioner, phases, desired, args.latency)
+    for channels in args.channels:
+        elapsed = run(f'async, {channels} kanalen',
+                      lambda parameters: PipelinedProvisioner(parameters, channels=channels),
+                      phases, desired, args.latency)
+        print(f"{'':<22} {baseline / elapsed:.1f}x sneller dan blocking")
+
+
+if __name__ == '__main__':
+    main()
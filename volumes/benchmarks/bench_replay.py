@@ -0,0 +1,124 @@
+"""Benchmark: DLQ replay van N berichten tegen de lokale AMQP stand-in.
+
+De stand-in draait in een eigen proces. pos.dlq wordt gevuld met berichten die (via
+een x-death header) oorspronkelijk naar user-management / user.register gingen; elk
+n-de bericht had user.delete en valt buiten het filter. Na de replay moet elke abonnee
+van user.register de gefilterde berichten precies één keer hebben en moeten de overige
+berichten nog in pos.dlq staan.
+
+Met --unroutable-every ging elk n-de bericht oorspronkelijk via een exchange waar
+user.register nergens meer heen routeert: de broker stuurt het terug (mandatory) en
+het moet weer in pos.dlq staan. Met --target queue gaan de berichten alleen terug naar
+pos.user; het filter blijft op de oorspronkelijke routing key werken. Met --nack-every weigert de stand-in elke n-de publicatie. De replay moet dan gewoon
+afronden, de geweigerde originelen horen terug in pos.dlq en er mag geen bericht
+verloren gaan of dubbel aankomen.
+
+    python3 bench_replay.py --messages 100000 --prefetch 1000
+    python3 bench_replay.py --messages 20000 --unroutable-every 50 --nack-every 97
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import pika
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'topology'))
+
+from amqp_standin import start_process  # noqa: E402
+from async_provision import PipelinedProvisioner  # noqa: E402
+from configure import TOPOLOGY_FILE, build_operations  # noqa: E402
+from dlq_replay import DlqReplayer  # noqa: E402
+from topology import Topology, load_topology, plan  # noqa: E402
+
+
+def origin(i, skip_every, unroutable_every):
+    """(exchange, routing key) van bericht i in de DLQ"""
+    if skip_every and i % skip_every == 0:
+        return 'user-management', 'user.delete'
+    if unroutable_every and i % unroutable_every == 1:
+        # Bestaande exchange zonder binding voor user.register
+        return 'company', 'user.register'
+    return 'user-management', 'user.register'
+
+
+def fill_dlq(parameters, queue, count, skip_every, unroutable_every):
+    connection = pika.BlockingConnection(parameters)
+    channel = connection.channel()
+    body = b'<user/>' * 20
+    for i in range(count):
+        exchange, routing_key = origin(i, skip_every, unroutable_every)
+        death = {'queue': 'pos.user', 'exchange': exchange, 'routing-keys': [routing_key],
+                 'reason': 'rejected', 'count': 1}
+        properties = pika.BasicProperties(delivery_mode=2, headers={'x-death': [death]})
+        channel.basic_publish('', queue, body, properties)
+    depth = channel.queue_declare(queue, passive=True).method.message_count
+    connection.close()
+    return depth
+
+
+def depths(parameters, queues):
+    connection = pika.BlockingConnection(parameters)
+    channel = connection.channel()
+    result = {queue: channel.queue_declare(queue, passive=True).method.message_count for queue in queues}
+    connection.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark van dlq_replay')
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--prefetch', type=int, default=1000)
+    parser.add_argument('--skip-every', type=int, default=10, help='elk n-de bericht valt buiten het filter')
+    parser.add_argument('--unroutable-every', type=int, default=0,
+                        help='elk n-de bericht komt bij het afspelen nergens aan')
+    parser.add_argument('--target', choices=('original', 'queue'), default='original')
+    parser.add_argument('--nack-every', type=int, default=0, help='de broker weigert elke n-de publicatie')
+    args = parser.parse_args()
+    logging.getLogger('pika').setLevel(logging.WARNING)
+
+    process, port = start_process(nack_every=args.nack_every)
+    parameters = pika.ConnectionParameters('127.0.0.1', port, '/', pika.PlainCredentials('guest', 'guest'))
+    desired = load_topology(TOPOLOGY_FILE)
+    PipelinedProvisioner(parameters).run(build_operations(plan(desired, Topology()), desired))
+    fill_dlq(parameters, 'pos.dlq', args.messages, args.skip_every, args.unroutable_every)
+
+    replayer = DlqReplayer(parameters, 'pos.dlq', target=args.target, prefetch=args.prefetch,
+                           key_pattern='user.register')
+    start = time.perf_counter()
+    stats = replayer.run()
+    elapsed = time.perf_counter() - start
+
+    origins = [origin(i, args.skip_every, args.unroutable_every) for i in range(args.messages)]
+    skipped = origins.count(('user-management', 'user.delete'))
+    unroutable = origins.count(('company', 'user.register'))
+    if args.target == 'queue':
+        # Terug naar de queue waar het misging; routeert altijd, ook bij een onrouteerbare origine
+        subscribers = ['pos.user']
+        unroutable = 0
+    else:
+        subscribers = sorted(b.queue for b in desired.bindings
+                             if b.exchange == 'user-management' and b.routing_key == 'user.register')
+    result = depths(parameters, subscribers + ['pos.dlq'])
+    process.terminate()
+
+    replayed = stats['replayed']
+    if args.nack_every:
+        # Ge-nackte originelen gaan terug de DLQ in; een deel daarvan valt buiten deze run
+        assert stats['failed'] > 0, stats
+        assert replayed <= args.messages - skipped - unroutable, stats
+        assert stats['returned'] <= unroutable, stats
+    else:
+        assert replayed == args.messages - skipped - unroutable, stats
+        assert stats['returned'] == unroutable, stats
+    assert result.pop('pos.dlq') == args.messages - replayed, result
+    assert all(depth == replayed for depth in result.values()), result
+    print(f"{args.messages} berichten in {elapsed:.2f} s ({args.messages / elapsed:.0f}/s), "
+          f"prefetch {args.prefetch}: {stats}")
+    print(f"{len(subscribers)} abonnees kregen elk {replayed} berichten, "
+          f"{args.messages - replayed} bleven in pos.dlq")
+
+
+if __name__ == '__main__':
+    main()
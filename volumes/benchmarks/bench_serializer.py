@@ -0,0 +1,67 @@
+"""Micro-benchmark: heartbeat-serializer met template vs. het oude ElementTree + minidom pad.
+
+Gebruik: python bench_serializer.py [aantal]
+"""
+import os
+import sys
+import timeit
+import xml.dom.minidom
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'heartbeat'))
+
+from heartbeat_xml import render_heartbeat  # noqa: E402
+
+SENDERS = [
+    'attendify-frontend-wordpress-1',
+    'attendify-frontend-db-1',
+    'attendify-frontend-phpmyadmin-1',
+    'attendify-frontend-consumer-user-1',
+    'attendify-frontend-consumer-payment-1',
+]
+
+# Randgevallen die byte voor byte gelijk moeten blijven
+EDGE_CASES = ['a&b<c>"d\'', ' spaties ', 'é-ü', 'regel\r\neinde', '']
+
+
+def legacy_heartbeat(container_name, timestamp):
+    """Het oorspronkelijke pad uit create_heartbeat_message"""
+    root = ET.Element('heartbeat')
+    ET.SubElement(root, 'sender').text = container_name
+    ET.SubElement(root, 'timestamp').text = timestamp
+
+    rough_string = ET.tostring(root, encoding='utf-8', method='xml')
+    reparsed = xml.dom.minidom.parseString(rough_string)
+    pretty_xml = reparsed.toprettyxml(indent="  ")
+
+    pretty_xml_no_header = '\n'.join(pretty_xml.split('\n')[1:]).strip()
+    return pretty_xml_no_header.encode('utf-8')
+
+
+def check_identical():
+    timestamp = datetime.utcnow().isoformat() + 'Z'
+    for sender in SENDERS + EDGE_CASES:
+        expected = legacy_heartbeat(sender, timestamp)
+        actual = render_heartbeat(sender, timestamp)
+        if expected != actual:
+            raise SystemExit(f"Verschil voor {sender!r}:\n{expected!r}\n{actual!r}")
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    check_identical()
+    print("Uitvoer identiek aan het minidom-pad")
+
+    timestamp = datetime.utcnow().isoformat() + 'Z'
+    results = {}
+    for label, func in (('minidom', legacy_heartbeat), ('template', render_heartbeat)):
+        seconds = min(timeit.repeat(
+            lambda: [func(sender, timestamp) for sender in SENDERS], number=number // len(SENDERS), repeat=3))
+        results[label] = seconds
+        print(f"{label:>9}: {seconds / number * 1e6:8.2f} µs per bericht")
+    print(f"  speedup: {results['minidom'] / results['template']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Controle van de labels die ContainerDiscovery per container leest, zonder Docker.
+
+Zet een probe-label op containers met een standaardprobe (http met path, mysql met
+login) en controleert dat een ander type met een lege optielijst begint, dat opties
+die het type niet kent wegvallen, dat ongeldige waarden (port=http, probe=https) de
+standaard laten staan en dat run_probe met het resultaat geen TypeError/KeyError geeft.
+
+    python3 check_discovery.py
+"""
+import logging
+import os
+import socket
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'heartbeat'))
+
+from discovery import LABEL_PREFIX, ContainerDiscovery  # noqa: E402
+from probes import run_probe  # noqa: E402
+
+DEFAULTS = {
+    'wordpress': {'port': 80, 'probe': {'type': 'http', 'path': '/'}},
+    'db': {'port': 3306, 'probe': {'type': 'mysql', 'user': 'u', 'password': 'p', 'database': 'd'}},
+}
+
+# (container, labels, verwachte Target-velden port/probe/interval)
+CASES = [
+    ('wordpress', {}, 80, {'type': 'http', 'path': '/'}, 1.0),
+    ('wordpress', {'probe': 'tcp'}, 80, {'type': 'tcp'}, 1.0),
+    ('db', {'probe': 'tcp'}, 3306, {'type': 'tcp'}, 1.0),
+    ('db', {'probe': 'mysql'}, 3306, DEFAULTS['db']['probe'], 1.0),
+    ('db', {'probe': 'http', 'path': '/health'}, 3306, {'type': 'http', 'path': '/health'}, 1.0),
+    ('wordpress', {'probe': 'tcp', 'path': '/health'}, 80, {'type': 'tcp'}, 1.0),
+    ('wordpress', {'probe': 'https'}, 80, {'type': 'http', 'path': '/'}, 1.0),
+    ('wordpress', {'probe': 'none'}, 80, None, 1.0),
+    ('wordpress', {'port': 'http', 'interval': 'x'}, 80, {'type': 'http', 'path': '/'}, 1.0),
+    ('other', {'port': '8080', 'probe': 'http', 'interval': '2.5'}, 8080, {'type': 'http'}, 2.5),
+    ('other', {'probe': 'tcp'}, None, None, 1.0),
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    discovery = ContainerDiscovery(None, defaults=DEFAULTS)
+    closed_port = free_port()
+    for name, labels, port, probe, interval in CASES:
+        container = {'Names': [f'/{name}'], 'Labels': {LABEL_PREFIX + key: value for key, value in labels.items()}}
+        target = discovery._to_target(container)
+        assert (target.port, target.probe, target.interval) == (port, probe, interval), (labels, target)
+        if target.probe is not None:
+            options = dict(target.probe)
+            result = run_probe(options.pop('type'), '127.0.0.1', closed_port, 0.2, **options)
+            # Een dichte poort mag falen, maar niet op de aanroep van de probe zelf
+            assert 'argument' not in (result.error or ''), (labels, result)
+        print(f"ok  {name:<10} {labels} -> {target.probe}")
+    print(f"{len(CASES)} gevallen goed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Minimale Docker Engine API op een UNIX socket, om heartbeat.py zonder Docker te draaien.
+
+Kent de calls die heartbeat doet: /containers/json (alle containers met de compose-labels
+van één project), /containers/{naam}/json en /containers/{naam}/stats?stream=true, met
+HTTP/1.1 keep-alive zoals DockerClient die gebruikt. Alle containers zijn 'running'.
+
+    docker = DockerStandin('/tmp/docker.sock', [f'load-{i}' for i in range(200)], project='loadtest')
+    docker.start()
+"""
+import json
+import os
+import socketserver
+import threading
+import time
+from urllib.parse import unquote, urlsplit
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        standin = self.server.standin
+        while True:
+            request_line = self.rfile.readline()
+            if not request_line:
+                return
+            while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                pass
+            path = urlsplit(request_line.split()[1].decode('ascii')).path
+            standin.requests += 1
+            parts = [unquote(part) for part in path.strip('/').split('/')]
+            try:
+                if parts == ['containers', 'json']:
+                    self._json(200, standin.list_containers())
+                elif len(parts) == 3 and parts[0] == 'containers' and parts[1] in standin.containers:
+                    if parts[2] == 'json':
+                        self._json(200, {'Name': '/' + parts[1], 'State': {'Status': 'running', 'Running': True}})
+                    elif parts[2] == 'stats':
+                        self._stream_stats()
+                        return
+                    else:
+                        self._json(404, {'message': f'page not found: {path}'})
+                else:
+                    self._json(404, {'message': f'no such container: {path}'})
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        reason = 'OK' if status == 200 else 'Not Found'
+        self.wfile.write(f'HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n'
+                         f'Content-Length: {len(body)}\r\n\r\n'.encode('ascii') + body)
+        self.wfile.flush()
+
+    def _stream_stats(self):
+        """Chunked stream met één stats-object per interval, tot de client de verbinding sluit"""
+        interval = self.server.standin.stats_interval
+        self.wfile.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nTransfer-Encoding: chunked\r\n\r\n')
+        previous = None
+        tick = 0
+        while True:
+            sample = {
+                'read': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'cpu_stats': {'cpu_usage': {'total_usage': tick * 20_000_000},
+                              'system_cpu_usage': tick * 1_000_000_000, 'online_cpus': 2},
+                'precpu_stats': previous or {},
+                'memory_stats': {'usage': 64_000_000 + tick * 4096, 'limit': 1_000_000_000,
+                                 'stats': {'inactive_file': 8_000_000}},
+                'networks': {'eth0': {'rx_bytes': tick * 50_000, 'tx_bytes': tick * 20_000}},
+            }
+            previous = sample['cpu_stats']
+            chunk = json.dumps(sample).encode('utf-8') + b'\n'
+            try:
+                self.wfile.write(b'%x\r\n' % len(chunk) + chunk + b'\r\n')
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            tick += 1
+            time.sleep(interval)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class DockerStandin:
+    def __init__(self, path, containers, project='loadtest', stats_interval=1.0):
+        self.path = path
+        self.containers = set(containers)
+        self.project = project
+        self.stats_interval = stats_interval
+        self.requests = 0
+        self._server = None
+
+    def list_containers(self):
+        return [{
+            'Names': ['/' + name],
+            'State': 'running',
+            'Status': 'Up',
+            'Ports': [],
+            'Labels': {'com.docker.compose.project': self.project, 'com.docker.compose.service': name},
+        } for name in sorted(self.containers)]
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = _Server(self.path, _Handler)
+        self._server.standin = self
+        threading.Thread(target=self._server.serve_forever, name='docker-standin', daemon=True).start()
+        return self.path
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            os.unlink(self.path)
@@ -0,0 +1,339 @@
+"""Liveness-aggregator: leest alle heartbeats en meldt senders die stil vallen.
+
+Consumeert een eigen queue (monitoring.heartbeat.aggregator, gebonden op de routing key
+monitoring.heartbeat), zodat monitoring.heartbeat zelf onaangeroerd blijft voor de
+monitoring-dienst.
+
+Per sender staat alleen het tijdstip van de laatste heartbeat in een index; een heartbeat
+kost zo één dict-update. Elke sender heeft hooguit één timer in een hashed timing wheel.
+Loopt die af terwijl er intussen een nieuwere heartbeat was, dan wordt hij opnieuw
+ingepland op last_seen + timeout; anders gaat er een failure naar monitoring.failure.
+Zo wordt er nooit over alle senders gescand. Senders die zelf DOWN melden (aggregated
+heartbeats) krijgen direct een failure.
+
+Met HEARTBEAT_PUBLISH_MODE=transitions komt een levende sender alleen elke
+HEARTBEAT_SUMMARY_INTERVAL seconden langs in een <heartbeats>. Senders die het laatst
+via zo'n bericht gezien zijn, krijgen daarom SUMMARY_TIMEOUT in plaats van TIMEOUT.
+
+Acks gaan per batch (multiple=True), met een ruime prefetch.
+"""
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import pika
+
+from heartbeat_xml import HeartbeatParseError, parse_heartbeat, render_failure
+from metrics import Counter, Gauge, Histogram, start_http_server
+from publisher import HeartbeatPublisher
+from timing_wheel import TimingWheel
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+RABBITMQ_HOST = os.environ.get('RABBITMQ_HOSTNAME', 'rabbitmq')
+RABBITMQ_PORT = int(os.environ.get('RABBITMQ_AMQP_PORT', '5672'))
+RABBITMQ_USERNAME = 'attendify'
+RABBITMQ_PASSWORD = os.environ.get('RABBITMQ_PASSWORD', 'uXe5u1oWkh32JyLA')  # Default voor testen
+RABBITMQ_VHOST = 'attendify'
+
+EXCHANGE_NAME = 'monitoring'
+HEARTBEAT_QUEUE = os.environ.get('AGGREGATOR_QUEUE', 'monitoring.heartbeat.aggregator')
+FAILURE_ROUTING_KEY = 'monitoring.failure'
+
+# Een sender is stil als er zo lang geen heartbeat kwam
+TIMEOUT = float(os.environ.get('AGGREGATOR_TIMEOUT', '5'))
+# Zelfde waarde als bij heartbeat.py; standaard mag er één samenvatting wegvallen (plus marge)
+SUMMARY_INTERVAL = float(os.environ.get('HEARTBEAT_SUMMARY_INTERVAL', '30'))
+SUMMARY_TIMEOUT = float(os.environ.get('AGGREGATOR_SUMMARY_TIMEOUT', str(max(TIMEOUT, 2.5 * SUMMARY_INTERVAL))))
+# Na het (her)starten eerst de achterstand in de queue verwerken voordat er failures vallen
+STARTUP_GRACE = float(os.environ.get('AGGREGATOR_STARTUP_GRACE', str(TIMEOUT)))
+
+# Timing wheel: tick bepaalt de nauwkeurigheid, het aantal slots dekt bij voorkeur de timeout
+WHEEL_TICK = float(os.environ.get('AGGREGATOR_WHEEL_TICK', '0.1'))
+WHEEL_SLOTS = int(os.environ.get('AGGREGATOR_WHEEL_SLOTS', '512'))
+
+# Consumeren: prefetch en na hoeveel berichten of seconden er een multiple-ack gaat
+PREFETCH = int(os.environ.get('AGGREGATOR_PREFETCH', '5000'))
+ACK_EVERY = int(os.environ.get('AGGREGATOR_ACK_EVERY', '1000'))
+ACK_INTERVAL = float(os.environ.get('AGGREGATOR_ACK_INTERVAL', '0.2'))
+RECONNECT_DELAY = float(os.environ.get('AGGREGATOR_RECONNECT_DELAY', '5'))
+
+METRICS_PORT = int(os.environ.get('AGGREGATOR_METRICS_PORT', '9103'))
+METRICS_ADDR = os.environ.get('AGGREGATOR_METRICS_ADDR', '0.0.0.0')
+STATS_INTERVAL = float(os.environ.get('AGGREGATOR_STATS_INTERVAL', '60'))
+
+HEARTBEATS_RECEIVED = Counter('aggregator_heartbeats_total', 'Ontvangen heartbeats per status', ['status'])
+INVALID_MESSAGES = Counter('aggregator_invalid_messages_total', 'Berichten die geen heartbeat waren')
+FAILURES_PUBLISHED = Counter('aggregator_failures_total', 'Gepubliceerde failures per reden', ['reason'])
+SENDERS = Gauge('aggregator_senders', 'Bekende senders per toestand', ['state'])
+EXPIRY_DURATION = Histogram('aggregator_expiry_seconds', 'Duur van één tick van het timing wheel')
+
+REASON_TIMEOUT = 'timeout'
+REASON_DOWN = 'reported_down'
+
+
+def parse_timestamp(text):
+    """ISO-timestamp uit een heartbeat (met Z) als epoch-seconden, of None"""
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text.rstrip('Z')).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def isoformat(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat() + 'Z'
+
+
+class _Sender:
+    __slots__ = ('last_seen', 'status', 'timeout', 'silent', 'scheduled')
+
+    def __init__(self, last_seen, status, timeout):
+        self.last_seen = last_seen
+        self.status = status
+        self.timeout = timeout
+        self.silent = False
+        self.scheduled = False
+
+
+class LivenessIndex:
+    """Laatste heartbeat per sender, met timeouts via een timing wheel (monotone klok).
+
+    Een sender die het laatst via een samenvatting gezien is, krijgt summary_timeout.
+    """
+
+    def __init__(self, timeout, wheel, summary_timeout=None):
+        self.timeout = timeout
+        self.summary_timeout = summary_timeout or timeout
+        self._wheel = wheel
+        self._senders = {}
+
+    def __len__(self):
+        return len(self._senders)
+
+    def seen(self, sender, status, seen_at, summary=False):
+        """Verwerk een heartbeat; geeft 'new', 'recovered', 'down' of None terug"""
+        timeout = self.summary_timeout if summary else self.timeout
+        entry = self._senders.get(sender)
+        if entry is None:
+            entry = self._senders[sender] = _Sender(seen_at, status, timeout)
+            result = 'new'
+        else:
+            if seen_at < entry.last_seen:
+                return None
+            entry.last_seen = seen_at
+            entry.status = status
+            # Van samenvattingen terug naar losse heartbeats: de lopende timer gaat nog
+            # op de lange timeout af, daarna geldt de korte weer
+            entry.timeout = timeout
+            result = None
+
+        if status == 'DOWN':
+            if entry.silent:
+                return None
+            entry.silent = True
+            return 'down'
+        if entry.silent:
+            entry.silent = False
+            result = 'recovered'
+        if not entry.scheduled:
+            entry.scheduled = True
+            self._wheel.schedule(sender, seen_at + timeout)
+        return result
+
+    def expire(self, now):
+        """Senders die sinds de vorige aanroep stil gevallen zijn, als (sender, last_seen)"""
+        expired = []
+        for sender in self._wheel.advance(now):
+            entry = self._senders.get(sender)
+            if entry is None:
+                continue
+            entry.scheduled = False
+            if entry.silent:
+                continue
+            deadline = entry.last_seen + entry.timeout
+            if deadline > now:
+                # Intussen nieuwere heartbeat: opnieuw inplannen in plaats van per heartbeat
+                entry.scheduled = True
+                self._wheel.schedule(sender, deadline)
+                continue
+            entry.silent = True
+            expired.append((sender, entry.last_seen))
+        return expired
+
+    def counts(self):
+        silent = sum(1 for entry in self._senders.values() if entry.silent)
+        return {'alive': len(self._senders) - silent, 'silent': silent}
+
+
+class HeartbeatAggregator:
+    """Consumer op een SelectConnection die de LivenessIndex voedt en failures publiceert"""
+
+    def __init__(self, parameters, queue, index, publisher, prefetch=5000, ack_every=1000,
+                 ack_interval=0.2, tick=0.1, startup_grace=0.0, stats_interval=0.0):
+        self._parameters = parameters
+        self._queue = queue
+        self._index = index
+        self._publisher = publisher
+        self._prefetch = prefetch
+        self._ack_every = ack_every
+        self._ack_interval = ack_interval
+        self._tick = tick
+        self._startup_grace = startup_grace
+        self._stats_interval = stats_interval
+        self._next_stats = time.monotonic() + stats_interval
+        self._connection = None
+        self._channel = None
+
+    def run(self):
+        """Consumeer tot de aggregator gestopt wordt; herverbindt na een storing"""
+        while True:
+            self._channel = None
+            self._unacked = 0
+            self._last_tag = None
+            self._grace_until = time.monotonic() + self._startup_grace
+            self._connection = pika.SelectConnection(
+                self._parameters,
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_open_error,
+                on_close_callback=self._on_connection_closed,
+            )
+            self._connection.ioloop.start()
+            logging.warning(f"Verbinding met RabbitMQ weg, opnieuw over {RECONNECT_DELAY:.0f} s")
+            time.sleep(RECONNECT_DELAY)
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_open_error(self, connection, error):
+        logging.error(f"Kan niet verbinden met RabbitMQ: {error}")
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        self._channel = None
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel):
+        self._channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.basic_qos(prefetch_count=self._prefetch, callback=self._on_qos)
+
+    def _on_channel_closed(self, channel, reason):
+        logging.error(f"Kanaal gesloten: {reason}")
+        self._channel = None
+        if self._connection.is_open:
+            self._connection.close()
+
+    def _on_qos(self, frame):
+        self._channel.basic_consume(self._queue, self._on_message)
+        logging.info(f"Consumeert {self._queue} (prefetch {self._prefetch}, timeout {self._index.timeout:.1f} s, "
+                     f"na een samenvatting {self._index.summary_timeout:.1f} s)")
+        self._connection.ioloop.call_later(self._ack_interval, self._on_ack_timer)
+        self._connection.ioloop.call_later(self._tick, self._on_tick)
+
+    def _on_message(self, channel, method, properties, body):
+        self._last_tag = method.delivery_tag
+        self._unacked += 1
+        try:
+            timestamp, senders, kind = parse_heartbeat(body)
+        except HeartbeatParseError as e:
+            INVALID_MESSAGES.inc()
+            logging.warning(f"Ongeldige heartbeat genegeerd: {e}")
+            senders = []
+
+        if senders:
+            # Oude heartbeats uit de achterstand tellen vanaf hun eigen timestamp
+            now = time.monotonic()
+            sent = parse_timestamp(timestamp)
+            seen_at = now - max(0.0, time.time() - sent) if sent is not None else now
+            for sender, status in senders:
+                HEARTBEATS_RECEIVED.labels(status).inc()
+                change = self._index.seen(sender, status, seen_at, summary=kind != 'heartbeat')
+                if change == 'down':
+                    self._publish_failure(sender, REASON_DOWN, seen_at)
+                elif change == 'recovered':
+                    logging.info(f"{sender}: weer in leven")
+                elif change == 'new':
+                    logging.debug(f"{sender}: nieuwe sender")
+
+        if self._unacked >= self._ack_every:
+            self._flush_acks()
+
+    def _flush_acks(self):
+        if self._unacked and self._channel is not None:
+            self._channel.basic_ack(self._last_tag, multiple=True)
+            self._unacked = 0
+
+    def _on_ack_timer(self):
+        if self._channel is None:
+            return
+        self._flush_acks()
+        self._connection.ioloop.call_later(self._ack_interval, self._on_ack_timer)
+
+    def _on_tick(self):
+        if self._channel is None:
+            return
+        now = time.monotonic()
+        if now >= self._grace_until:
+            start = time.monotonic()
+            for sender, last_seen in self._index.expire(now):
+                logging.warning(f"{sender}: geen heartbeat sinds {now - last_seen:.1f} s")
+                self._publish_failure(sender, REASON_TIMEOUT, last_seen)
+            EXPIRY_DURATION.observe(time.monotonic() - start)
+        if self._stats_interval and now >= self._next_stats:
+            self._next_stats += self._stats_interval
+            log_stats(self._index, self._publisher)
+        self._connection.ioloop.call_later(self._tick, self._on_tick)
+
+    def _publish_failure(self, sender, reason, last_seen):
+        FAILURES_PUBLISHED.labels(reason).inc()
+        wall_last_seen = time.time() - (time.monotonic() - last_seen)
+        body = render_failure(sender, reason, isoformat(wall_last_seen), isoformat(time.time()))
+        self._publisher.publish_batch([(FAILURE_ROUTING_KEY, body)])
+
+
+def log_stats(index, publisher):
+    counts = index.counts()
+    for state, value in counts.items():
+        SENDERS.labels(state).set(value)
+    logging.info(
+        f"stats: heartbeats={HEARTBEATS_RECEIVED.total()} senders={counts} "
+        f"failures={FAILURES_PUBLISHED.total()} ongeldig={INVALID_MESSAGES.total()} publisher={publisher.stats}"
+    )
+
+
+def main():
+    credentials = pika.PlainCredentials(username=RABBITMQ_USERNAME, password=RABBITMQ_PASSWORD)
+    parameters = pika.ConnectionParameters(
+        host=RABBITMQ_HOST,
+        port=RABBITMQ_PORT,
+        credentials=credentials,
+        virtual_host=RABBITMQ_VHOST
+    )
+
+    # Failures mogen niet als verouderd weggegooid worden zoals heartbeats
+    publisher = HeartbeatPublisher(parameters, EXCHANGE_NAME, max_age=3600.0)
+    publisher.start()
+
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT, METRICS_ADDR)
+        logging.info(f"Metrics beschikbaar op http://{METRICS_ADDR}:{METRICS_PORT}/metrics")
+
+    index = LivenessIndex(TIMEOUT, TimingWheel(tick=WHEEL_TICK, size=WHEEL_SLOTS), summary_timeout=SUMMARY_TIMEOUT)
+    aggregator = HeartbeatAggregator(
+        parameters, HEARTBEAT_QUEUE, index, publisher, prefetch=PREFETCH, ack_every=ACK_EVERY,
+        ack_interval=ACK_INTERVAL, tick=WHEEL_TICK, startup_grace=STARTUP_GRACE, stats_interval=STATS_INTERVAL,
+    )
+
+    try:
+        aggregator.run()
+    except KeyboardInterrupt:
+        logging.info("Aggregator gestopt door gebruiker")
+    finally:
+        publisher.stop()
+
+
+if __name__ == '__main__':
+    main()
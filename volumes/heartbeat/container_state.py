@@ -0,0 +1,135 @@
+import json
+import logging
+import threading
+import time
+from urllib.parse import quote
+
+from metrics import Counter
+
+# Docker event-acties en de containerstatus die erbij hoort
+EVENT_STATES = {
+    'create': 'created',
+    'start': 'running',
+    'restart': 'running',
+    'unpause': 'running',
+    'pause': 'paused',
+    'die': 'exited',
+    'stop': 'exited',
+}
+
+EVENTS_FILTER = quote(json.dumps({'type': ['container']}))
+
+RECONNECTS = Counter('heartbeat_events_reconnects_total', 'Herverbindingen van de Docker events stream')
+
+
+def _health_from_status(status_text):
+    """Haal de health uit de Status-tekst van /containers/json, bv. 'Up 3 hours (healthy)'"""
+    if '(healthy)' in status_text:
+        return 'healthy'
+    if '(unhealthy)' in status_text:
+        return 'unhealthy'
+    if '(health: starting)' in status_text:
+        return 'starting'
+    return None
+
+
+class ContainerStateCache:
+    """Statustabel van containers, bijgewerkt via de Docker /events stream.
+
+    Een trage periodieke resync via /containers/json vangt gemiste events op.
+    Zolang de stream niet verbonden is, is de cache niet ready.
+    """
+
+    def __init__(self, docker, resync_interval=60.0, reconnect_delay=2.0):
+        self._docker = docker
+        self._resync_interval = resync_interval
+        self._reconnect_delay = reconnect_delay
+        self._states = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._watch_events, name='docker-events', daemon=True).start()
+        threading.Thread(target=self._resync_loop, name='docker-resync', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self._ready.clear()
+
+    def ready(self):
+        return self._ready.is_set()
+
+    def get(self, container_name):
+        """Geef (status, health) van een container, of (None, None) als hij onbekend is"""
+        with self._lock:
+            return self._states.get(container_name, (None, None))
+
+    def is_running(self, container_name):
+        return self.get(container_name)[0] == 'running'
+
+    def resync(self):
+        """Lees de volledige containerlijst in één call en vervang de tabel"""
+        status, containers = self._docker.get_json('/containers/json?all=1')
+        if status != 200:
+            raise RuntimeError(f"Docker API gaf status {status} bij resync")
+        states = {}
+        for container in containers:
+            entry = (container.get('State'), _health_from_status(container.get('Status', '')))
+            for name in container.get('Names', []):
+                states[name.lstrip('/')] = entry
+        with self._lock:
+            self._states = states
+
+    def apply_event(self, event):
+        if event.get('Type') != 'container':
+            return
+        action = event.get('Action', '')
+        name = event.get('Actor', {}).get('Attributes', {}).get('name')
+        if not name:
+            return
+
+        with self._lock:
+            state, health = self._states.get(name, (None, None))
+            if action == 'destroy':
+                self._states.pop(name, None)
+                return
+            if action.startswith('health_status'):
+                health = action.split(':', 1)[1].strip()
+            elif action in EVENT_STATES:
+                state = EVENT_STATES[action]
+                if state != 'running':
+                    health = None
+            else:
+                return
+            self._states[name] = (state, health)
+
+    def _watch_events(self):
+        while not self._stop.is_set():
+            try:
+                # Events vanaf vlak voor de resync opvragen, zodat er niets tussendoor valt
+                since = int(time.time()) - 1
+                self.resync()
+                stream = self._docker.stream(f'/events?since={since}&filters={EVENTS_FILTER}')
+                self._ready.set()
+                logging.info("Docker events stream verbonden, statuscache actief")
+                for event in stream:
+                    self.apply_event(event)
+                    if self._stop.is_set():
+                        break
+                logging.warning("Docker events stream gesloten")
+            except Exception as e:
+                logging.error(f"Docker events stream mislukt: {e}")
+            self._ready.clear()
+            if not self._stop.is_set():
+                RECONNECTS.inc()
+            self._stop.wait(self._reconnect_delay)
+
+    def _resync_loop(self):
+        while not self._stop.wait(self._resync_interval):
+            if not self._ready.is_set():
+                continue
+            try:
+                self.resync()
+            except Exception as e:
+                logging.error(f"Resync van containerstatus mislukt: {e}")
@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from urllib.parse import quote
+
+from metrics import Counter
+
+Sample = namedtuple('Sample', ['time', 'cpu_percent', 'memory', 'memory_limit', 'rx_bytes', 'tx_bytes'])
+ResourceSummary = namedtuple('ResourceSummary', [
+    'samples', 'cpu_avg', 'cpu_max', 'memory', 'memory_max', 'memory_limit', 'rx_rate', 'tx_rate',
+])
+
+RECONNECTS = Counter('heartbeat_stats_reconnects_total', 'Herverbindingen van Docker stats streams', ['container'])
+
+
+def parse_sample(stats, now):
+    """Eén object uit /containers/{id}/stats als Sample (CPU in % van één core, geheugen zonder page cache)"""
+    cpu = stats.get('cpu_stats') or {}
+    precpu = stats.get('precpu_stats') or {}
+    cpu_percent = None
+    cpu_delta = cpu.get('cpu_usage', {}).get('total_usage', 0) - precpu.get('cpu_usage', {}).get('total_usage', 0)
+    system_delta = cpu.get('system_cpu_usage', 0) - precpu.get('system_cpu_usage', 0)
+    if precpu.get('system_cpu_usage') and system_delta > 0:
+        online = cpu.get('online_cpus') or len(cpu.get('cpu_usage', {}).get('percpu_usage') or []) or 1
+        cpu_percent = cpu_delta / system_delta * online * 100.0
+
+    memory = stats.get('memory_stats') or {}
+    details = memory.get('stats') or {}
+    # cgroup v2 kent inactive_file, v1 total_inactive_file
+    cache = details.get('inactive_file', details.get('total_inactive_file', 0))
+    used = max(0, memory.get('usage', 0) - cache)
+
+    rx = tx = 0
+    for network in (stats.get('networks') or {}).values():
+        rx += network.get('rx_bytes', 0)
+        tx += network.get('tx_bytes', 0)
+    return Sample(now, cpu_percent, used, memory.get('limit', 0), rx, tx)
+
+
+def summarize(samples):
+    """Gemiddelde en piek over de ring buffer; netwerk als bytes per seconde over het venster"""
+    if not samples:
+        return None
+    cpu = [sample.cpu_percent for sample in samples if sample.cpu_percent is not None]
+    first, last = samples[0], samples[-1]
+    elapsed = last.time - first.time
+    if elapsed > 0 and last.rx_bytes >= first.rx_bytes and last.tx_bytes >= first.tx_bytes:
+        rx_rate = (last.rx_bytes - first.rx_bytes) / elapsed
+        tx_rate = (last.tx_bytes - first.tx_bytes) / elapsed
+    else:
+        # Eén sample, of tellers gereset door een herstart van de container
+        rx_rate = tx_rate = None
+    return ResourceSummary(
+        len(samples),
+        sum(cpu) / len(cpu) if cpu else None,
+        max(cpu) if cpu else None,
+        last.memory,
+        max(sample.memory for sample in samples),
+        last.memory_limit,
+        rx_rate,
+        tx_rate,
+    )
+
+
+class ContainerStatsCollector:
+    """Houdt per container één Docker stats stream open en bewaart de laatste samples.
+
+    Docker stuurt op een stream ongeveer elke seconde een sample; de laatste `window`
+    samples staan per container in een ring buffer (deque met maxlen). Streams die
+    wegvallen (herstart, container weg) worden na reconnect_delay opnieuw geopend.
+    """
+
+    def __init__(self, docker, window=30, reconnect_delay=5.0, stream_timeout=10.0):
+        self._docker = docker
+        self._window = window
+        self._reconnect_delay = reconnect_delay
+        self._stream_timeout = stream_timeout
+        self._buffers = {}
+        self._stops = {}
+        self._lock = threading.Lock()
+
+    def sync(self, container_names):
+        """Open streams voor nieuwe containers en sluit die van verdwenen containers"""
+        wanted = set(container_names)
+        with self._lock:
+            for name in list(self._stops):
+                if name not in wanted:
+                    self._stops.pop(name).set()
+                    self._buffers.pop(name, None)
+            for name in wanted - set(self._stops):
+                stop = self._stops[name] = threading.Event()
+                self._buffers[name] = deque(maxlen=self._window)
+                threading.Thread(target=self._watch, args=(name, stop), name=f'stats-{name}', daemon=True).start()
+
+    def stop(self):
+        self.sync(())
+
+    def summaries(self):
+        """Samenvatting per container met minstens één sample, als {naam: ResourceSummary}"""
+        with self._lock:
+            snapshot = {name: list(buffer) for name, buffer in self._buffers.items()}
+        result = {}
+        for name, samples in sorted(snapshot.items()):
+            summary = summarize(samples)
+            if summary is not None:
+                result[name] = summary
+        return result
+
+    def _watch(self, name, stop):
+        path = f'/containers/{quote(name, safe="")}/stats?stream=true'
+        while not stop.is_set():
+            try:
+                for stats in self._docker.stream(path, timeout=self._stream_timeout):
+                    if stop.is_set():
+                        return
+                    sample = parse_sample(stats, time.monotonic())
+                    with self._lock:
+                        buffer = self._buffers.get(name)
+                        if buffer is None:
+                            return
+                        buffer.append(sample)
+                logging.warning(f"Stats stream van {name} gesloten")
+            except Exception as e:
+                logging.error(f"Stats stream van {name} mislukt: {e}")
+            if stop.wait(self._reconnect_delay):
+                return
+            RECONNECTS.labels(name).inc()
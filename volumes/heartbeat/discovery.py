@@ -0,0 +1,205 @@
+import bisect
+import hashlib
+import inspect
+import json
+import logging
+import threading
+from collections import namedtuple
+from urllib.parse import quote
+
+from probes import PROBE_TYPES
+
+# Een te monitoren container; probe is een dict met 'type' en opties, of None
+Target = namedtuple('Target', ['name', 'port', 'probe', 'interval'])
+
+# Labels waarmee een container zijn monitoring kan sturen
+LABEL_PREFIX = 'attendify.heartbeat.'
+COMPOSE_PROJECT_LABEL = 'com.docker.compose.project'
+COMPOSE_SERVICE_LABEL = 'com.docker.compose.service'
+
+# Opties die elke probe naast host, port en timeout accepteert
+PROBE_OPTIONS = {
+    probe_type: set(list(inspect.signature(function).parameters)[3:])
+    for probe_type, function in PROBE_TYPES.items()
+}
+
+
+def _hash(value):
+    """Stabiele 64-bit hash (gelijk over processen heen, anders dan hash())"""
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent hashing van containernamen over heartbeat-instanties"""
+
+    def __init__(self, members, vnodes=64):
+        ring = sorted((_hash(f'{member}#{i}'), member) for member in members for i in range(vnodes))
+        self._hashes = [h for h, _ in ring]
+        self._members = [member for _, member in ring]
+
+    def owner(self, key):
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._members[index]
+
+
+class ContainerDiscovery:
+    """Vindt te monitoren containers met één gefilterde /containers/json call.
+
+    mode 'compose' neemt alle containers van het compose-project (behalve exclude),
+    mode 'label' alleen containers met attendify.heartbeat.enable=true en mode 'static'
+    de vaste lijst static_targets, zonder Docker-call. Per container kunnen labels
+    port, probe, path en interval zetten; wat ontbreekt komt uit defaults.
+    Met meerdere shards houdt deze instantie alleen de containers die de hash ring
+    aan haar toewijst. Het resultaat wordt gecached en op de achtergrond ververst.
+    """
+
+    def __init__(self, docker, mode='compose', project=None, exclude=(), defaults=None, static_targets=(),
+                 default_interval=1.0, shard_index=0, shard_count=1, refresh_interval=30.0):
+        self._docker = docker
+        self._mode = mode
+        self._static_targets = list(static_targets)
+        self._project = project
+        self._exclude = set(exclude)
+        self._defaults = defaults or {}
+        self._default_interval = default_interval
+        self._shard = f'heartbeat-{shard_index}'
+        self._ring = HashRing([f'heartbeat-{i}' for i in range(shard_count)]) if shard_count > 1 else None
+        self._refresh_interval = refresh_interval
+        self._targets = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._warned = set()
+        self.version = 0
+
+    def start(self):
+        self.refresh()
+        if self._mode == 'static':
+            return
+        threading.Thread(target=self._refresh_loop, name='discovery', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def targets(self):
+        with self._lock:
+            return list(self._targets)
+
+    def _list_path(self):
+        if self._mode == 'label':
+            label = f'{LABEL_PREFIX}enable=true'
+        else:
+            label = f'{COMPOSE_PROJECT_LABEL}={self._project}'
+        filters = quote(json.dumps({'label': [label]}))
+        return f'/containers/json?all=1&filters={filters}'
+
+    def refresh(self):
+        """Lees de containerlijst opnieuw; bij een fout blijft de vorige lijst staan"""
+        if self._mode == 'static':
+            candidates = self._static_targets
+        else:
+            try:
+                status, containers = self._docker.get_json(self._list_path())
+                if status != 200:
+                    raise RuntimeError(f"Docker API gaf status {status}")
+            except Exception as e:
+                logging.error(f"Container discovery mislukt: {e}")
+                return
+            candidates = []
+            for container in containers:
+                try:
+                    candidates.append(self._to_target(container))
+                except Exception as e:
+                    # Eén vreemde container mag de rest van de lijst niet tegenhouden
+                    logging.error(f"Container {container.get('Names')} overgeslagen: {e}")
+
+        targets = []
+        for target in candidates:
+            if target is None:
+                continue
+            if self._ring is not None and self._ring.owner(target.name) != self._shard:
+                continue
+            targets.append(target)
+        targets.sort()
+
+        with self._lock:
+            if targets == self._targets:
+                return
+            previous = {target.name for target in self._targets}
+            self._targets = targets
+            self.version += 1
+        current = {target.name for target in targets}
+        logging.info(f"Discovery: {len(targets)} container(s) voor {self._shard}, "
+                     f"nieuw: {sorted(current - previous)[:20]}, weg: {sorted(previous - current)[:20]}")
+
+    def _to_target(self, container):
+        labels = container.get('Labels') or {}
+        names = container.get('Names') or []
+        if not names:
+            return None
+        name = names[0].lstrip('/')
+
+        if labels.get(f'{LABEL_PREFIX}enable', '').lower() == 'false':
+            return None
+        if labels.get(COMPOSE_SERVICE_LABEL) in self._exclude:
+            return None
+
+        default = self._defaults.get(name, {})
+        port = self._label(name, labels, 'port', int, lambda value: 0 < value < 65536) or default.get('port')
+        if port is None:
+            private_ports = sorted(p['PrivatePort'] for p in container.get('Ports') or [] if 'PrivatePort' in p)
+            port = private_ports[0] if private_ports else None
+
+        probe = default.get('probe')
+        probe_type = self._label(name, labels, 'probe', str, lambda value: value == 'none' or value in PROBE_TYPES)
+        if probe_type is not None and (probe is None or probe.get('type') != probe_type):
+            # Ander type: opties van de standaardprobe (path, user, ...) horen daar niet bij
+            probe = {'type': probe_type}
+        if probe is not None and f'{LABEL_PREFIX}path' in labels:
+            probe = dict(probe, path=labels[f'{LABEL_PREFIX}path'])
+        if port is None or (probe is not None and probe.get('type') == 'none'):
+            probe = None
+        if probe is not None:
+            probe = self._probe_options(name, probe)
+
+        interval = (self._label(name, labels, 'interval', float, lambda value: 0 < value < float('inf'))
+                    or default.get('interval') or self._default_interval)
+        return Target(name, int(port) if port is not None else None, probe, interval)
+
+    def _label(self, name, labels, key, parse, valid):
+        """Label van een container, of None als het ontbreekt of ongeldig is (met één waarschuwing)"""
+        value = labels.get(f'{LABEL_PREFIX}{key}')
+        if not value:
+            return None
+        try:
+            parsed = parse(value)
+            if valid(parsed):
+                return parsed
+        except ValueError:
+            pass
+        self._warn(name, f"Ongeldig label {LABEL_PREFIX}{key}={value!r} op {name}, genegeerd")
+        return None
+
+    def _probe_options(self, name, probe):
+        """Probe zonder de opties die het probe-type niet kent; een onbekend type valt weg"""
+        accepted = PROBE_OPTIONS.get(probe.get('type'))
+        if accepted is None:
+            self._warn(name, f"Onbekend probe-type {probe.get('type')!r} voor {name}, alleen Docker-status")
+            return None
+        unknown = sorted(set(probe) - accepted - {'type'})
+        if unknown:
+            self._warn(name, f"Probe {probe['type']} op {name} kent {', '.join(unknown)} niet, genegeerd")
+        return {key: value for key, value in probe.items() if key == 'type' or key in accepted}
+
+    def _warn(self, name, message):
+        """Log een waarschuwing één keer per container en melding, niet bij elke refresh"""
+        if (name, message) not in self._warned:
+            self._warned.add((name, message))
+            logging.warning(message)
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self._refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # De thread moet blijven leven, anders blijft de targetlijst voorgoed staan
+                logging.exception("Discovery refresh mislukt")
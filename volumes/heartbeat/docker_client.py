@@ -0,0 +1,261 @@
+import json
+import socket
+import threading
+from collections import deque
+
+from metrics import Counter
+
+DOCKER_SOCKET = '/var/run/docker.sock'
+BUFFER_SIZE = 64 * 1024
+
+RECONNECTS = Counter('heartbeat_docker_reconnects_total', 'Vervangen Docker-verbindingen die door de daemon gesloten waren')
+
+
+class DockerError(Exception):
+    """Ongeldig of onverwacht antwoord van de Docker API"""
+
+
+class _Connection:
+    """Eén persistente HTTP/1.1 verbinding over de Docker UNIX socket"""
+
+    def __init__(self, socket_path, timeout):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(socket_path)
+        except OSError:
+            self.sock.close()
+            raise
+        self._buf = bytearray(BUFFER_SIZE)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        # Bytes van het huidige antwoord; 0 betekent dat de daemon nog niets gestuurd heeft
+        self.received = 0
+
+    def close(self):
+        self._view.release()
+        self.sock.close()
+
+    def _fill(self):
+        """Lees meer data van de socket in de (hergebruikte) buffer"""
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif self._end == len(self._buf):
+            pending = self._end - self._start
+            if self._start > 0:
+                self._buf[:pending] = self._buf[self._start:self._end]
+            else:
+                # Regel past niet in de buffer: verdubbelen
+                self._view.release()
+                self._buf = self._buf + bytearray(len(self._buf))
+                self._view = memoryview(self._buf)
+            self._start, self._end = 0, pending
+        received = self.sock.recv_into(self._view[self._end:])
+        if received == 0:
+            raise ConnectionError("Docker heeft de verbinding gesloten")
+        self._end += received
+        self.received += received
+
+    def read_line(self):
+        while True:
+            index = self._buf.find(b'\r\n', self._start, self._end)
+            if index >= 0:
+                line = bytes(self._view[self._start:index])
+                self._start = index + 2
+                return line
+            self._fill()
+
+    def read_exact(self, size):
+        body = bytearray(size)
+        view = memoryview(body)
+        received = min(size, self._end - self._start)
+        view[:received] = self._view[self._start:self._start + received]
+        self._start += received
+        while received < size:
+            count = self.sock.recv_into(view[received:])
+            if count == 0:
+                raise ConnectionError("Docker heeft de verbinding gesloten")
+            received += count
+            self.received += count
+        view.release()
+        return body
+
+    def read_until_close(self):
+        parts = [bytes(self._view[self._start:self._end])]
+        self._start = self._end = 0
+        while True:
+            chunk = self.sock.recv(BUFFER_SIZE)
+            if not chunk:
+                return b''.join(parts)
+            parts.append(chunk)
+
+    def read_some(self):
+        """Geef wat er gebufferd is, of wacht op de volgende data van de socket"""
+        if self._start == self._end:
+            self._fill()
+        data = bytes(self._view[self._start:self._end])
+        self._start = self._end = 0
+        return data
+
+    def read_chunk(self):
+        """Lees één chunk van een chunked body; b'' betekent einde van de body"""
+        size_line = self.read_line()
+        try:
+            size = int(size_line.split(b';', 1)[0], 16)
+        except ValueError:
+            raise DockerError(f"Ongeldige chunk-grootte: {size_line!r}")
+        if size == 0:
+            # Trailers overslaan tot de lege regel
+            while self.read_line():
+                pass
+            return b''
+        chunk = self.read_exact(size)
+        if self.read_line():
+            raise DockerError("Chunk niet afgesloten met CRLF")
+        return chunk
+
+    def read_head(self):
+        status_line = self.read_line()
+        parts = status_line.split(b' ', 2)
+        if len(parts) < 2 or not parts[0].startswith(b'HTTP/1.'):
+            raise DockerError(f"Ongeldige statusregel: {status_line!r}")
+        try:
+            status = int(parts[1])
+        except ValueError:
+            raise DockerError(f"Ongeldige statusregel: {status_line!r}")
+        headers = {}
+        while True:
+            line = self.read_line()
+            if not line:
+                break
+            name, _, value = line.partition(b':')
+            headers[name.strip().lower().decode('latin-1')] = value.strip().decode('latin-1')
+        return status, headers
+
+    def send(self, method, path):
+        self.received = 0
+        self.sock.sendall(f"{method} {path} HTTP/1.1\r\nHost: docker\r\n\r\n".encode('ascii'))
+
+    def request(self, method, path):
+        """Stuur een request en lees het volledige antwoord; geeft (status, body, herbruikbaar)"""
+        self.send(method, path)
+        status, headers = self.read_head()
+        reusable = headers.get('connection', '').lower() != 'close'
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                chunk = self.read_chunk()
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            try:
+                length = int(headers['content-length'])
+            except ValueError:
+                length = -1
+            if length < 0:
+                raise DockerError(f"Ongeldige Content-Length: {headers['content-length']!r}")
+            body = self.read_exact(length)
+        elif status in (204, 304) or method == 'HEAD':
+            body = b''
+        else:
+            body = self.read_until_close()
+            reusable = False
+        return status, body, reusable
+
+
+class DockerClient:
+    """Docker API client met een kleine pool van keep-alive verbindingen"""
+
+    def __init__(self, socket_path=DOCKER_SOCKET, pool_size=4, timeout=2.0):
+        self._socket_path = socket_path
+        self._timeout = timeout
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def request(self, method, path):
+        """Voer een request uit en geef (status, body) terug.
+
+        Een hergebruikte verbinding die de daemon intussen gesloten heeft (verbroken
+        vóór er iets van het antwoord binnen was) wordt één keer vervangen door een
+        nieuwe. Elke andere fout, ook een timeout, sluit de verbinding en gaat door.
+        """
+        self._slots.acquire()
+        try:
+            retried = False
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle and not retried else None
+                reused = conn is not None
+                if conn is None:
+                    conn = _Connection(self._socket_path, self._timeout)
+                try:
+                    status, body, reusable = conn.request(method, path)
+                except (OSError, ValueError, DockerError) as e:
+                    conn.close()
+                    if reused and isinstance(e, ConnectionError) and not conn.received:
+                        RECONNECTS.inc()
+                        retried = True
+                        continue
+                    if isinstance(e, ValueError):
+                        # Bv. een pad dat niet in ASCII past of een negatieve chunk-grootte
+                        raise DockerError(f"Ongeldig request of antwoord: {e}") from e
+                    raise
+                if reusable:
+                    with self._lock:
+                        self._idle.append(conn)
+                else:
+                    conn.close()
+                return status, body
+        finally:
+            self._slots.release()
+
+    def get_json(self, path):
+        status, body = self.request('GET', path)
+        return status, (json.loads(body) if body else None)
+
+    def stream(self, path, timeout=None):
+        """Open een streaming endpoint (zoals /events) en geef een iterator over de JSON-objecten.
+
+        Een stream gebruikt een eigen verbinding buiten de pool; die wordt gesloten
+        zodra de iterator stopt of wordt opgeruimd.
+        """
+        conn = _Connection(self._socket_path, timeout)
+        try:
+            conn.send('GET', path)
+            status, headers = conn.read_head()
+            if status != 200:
+                raise DockerError(f"Docker API gaf status {status} voor {path}")
+        except Exception:
+            conn.close()
+            raise
+        chunked = 'chunked' in headers.get('transfer-encoding', '').lower()
+        return self._iter_stream(conn, chunked)
+
+    @staticmethod
+    def _iter_stream(conn, chunked):
+        try:
+            pending = b''
+            while True:
+                try:
+                    data = conn.read_chunk() if chunked else conn.read_some()
+                except ConnectionError:
+                    return
+                if not data:
+                    return
+                lines = (pending + data).split(b'\n')
+                pending = lines.pop()
+                for line in lines:
+                    if line.strip():
+                        yield json.loads(line)
+        finally:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
@@ -1,22 +1,31 @@
-import socket
 import time
 import logging
 import os
-import xml.etree.ElementTree as ET
-import xml.dom.minidom  # Voor het mooi maken van de XML
-import json
+import threading
 import pika
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from probe_engine import ProbeEngine, TIMEOUT
+from docker_client import DockerClient
+from container_state import ContainerStateCache
+from container_stats import ContainerStatsCollector
+from heartbeat_xml import render_heartbeat, render_heartbeats, render_stats
+from publisher import HeartbeatPublisher
+from probes import run_probe
+from metrics import Counter, Gauge, Histogram, start_http_server
+from scheduler import Scheduler
+from discovery import ContainerDiscovery, Target
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 
-# Docker socket
-DOCKER_SOCKET = '/var/run/docker.sock'
+# Docker socket (persistente verbindingen, gedeeld door alle probes)
+DOCKER_SOCKET = os.environ.get('HEARTBEAT_DOCKER_SOCKET', '/var/run/docker.sock')
+DOCKER_POOL_SIZE = int(os.environ.get('HEARTBEAT_DOCKER_POOL', '8'))
 
-# RabbitMQ connection parameters
-RABBITMQ_HOST = 'rabbitmq'
-RABBITMQ_PORT = 5672
+# RabbitMQ connection parameters (host en poort overschrijfbaar, bv. voor de lokale stand-in)
+RABBITMQ_HOST = os.environ.get('RABBITMQ_HOSTNAME', 'rabbitmq')
+RABBITMQ_PORT = int(os.environ.get('RABBITMQ_AMQP_PORT', '5672'))
 RABBITMQ_USERNAME = 'attendify'
 RABBITMQ_PASSWORD = os.environ.get('RABBITMQ_PASSWORD', 'uXe5u1oWkh32JyLA')  # Default voor testen
 RABBITMQ_VHOST = 'attendify'
@@ -25,13 +34,82 @@ RABBITMQ_VHOST = 'attendify'
 
 EXCHANGE_NAME = 'monitoring'
 ROUTING_KEY = 'monitoring.heartbeat'
+STATS_ROUTING_KEY = 'monitoring.stats'
+
+# Planning: standaardinterval per service, met eigen intervallen in SERVICE_INTERVALS.
+# Services krijgen een vaste offset binnen hun interval plus wat jitter, zodat niet alle
+# probes op hetzelfde moment vallen. Wie later dan de tolerantie aan de beurt komt is een overrun.
+HEARTBEAT_INTERVAL = float(os.environ.get('HEARTBEAT_INTERVAL', '1'))
+HEARTBEAT_JITTER = float(os.environ.get('HEARTBEAT_JITTER', '0.05'))
+OVERRUN_TOLERANCE = float(os.environ.get('HEARTBEAT_OVERRUN_TOLERANCE', '0.1'))
+SLOT_WORKERS = int(os.environ.get('HEARTBEAT_SLOT_WORKERS', '4'))
+
+# Discovery: 'compose' (alle containers van het compose-project), 'label' (alleen containers met
+# label attendify.heartbeat.enable=true) of 'static' (de SERVICES-lijst hieronder).
+# Meerdere instanties verdelen de containers via consistent hashing op de containernaam.
+DISCOVERY_MODE = os.environ.get('HEARTBEAT_DISCOVERY', 'compose')
+COMPOSE_PROJECT = os.environ.get('HEARTBEAT_COMPOSE_PROJECT', 'attendify-frontend')
+EXCLUDE_SERVICES = [name for name in os.environ.get('HEARTBEAT_EXCLUDE', 'heartbeat,python').split(',') if name]
+DISCOVERY_INTERVAL = float(os.environ.get('HEARTBEAT_DISCOVERY_INTERVAL', '30'))
+SHARD_INDEX = int(os.environ.get('HEARTBEAT_SHARD_INDEX', '0'))
+SHARD_COUNT = int(os.environ.get('HEARTBEAT_SHARD_COUNT', '1'))
+
+# 'per-container' publiceert elke slot een heartbeat per levende container. 'transitions' publiceert
+# statuswijzigingen direct en daarnaast elke SUMMARY_INTERVAL seconden één geaggregeerd bericht
+# met alle senders (schema heartbeats.xsd), op dezelfde routing key.
+PUBLISH_MODE = os.environ.get('HEARTBEAT_PUBLISH_MODE', 'per-container')
+SUMMARY_INTERVAL = float(os.environ.get('HEARTBEAT_SUMMARY_INTERVAL', '30'))
+
+# Publicatie: begrensde outbox tijdens broker-storingen, oude heartbeats worden weggegooid
+OUTBOX_SIZE = int(os.environ.get('HEARTBEAT_OUTBOX_SIZE', '10000'))
+MAX_MESSAGE_AGE = float(os.environ.get('HEARTBEAT_MAX_AGE', '5'))
+
+# Probe-parameters: de containers van een slot worden parallel gecontroleerd binnen de deadline
+PROBE_MAX_WORKERS = int(os.environ.get('HEARTBEAT_PROBE_WORKERS', '32'))
+PROBE_DEADLINE = float(os.environ.get('HEARTBEAT_PROBE_DEADLINE', '0.8'))
+
+# 'poll' vraagt elke tick de status per container op, 'events' leest ze uit een cache
+# die gevoed wordt door de Docker /events stream (met periodieke volledige resync)
+HEARTBEAT_MODE = os.environ.get('HEARTBEAT_MODE', 'poll')
+RESYNC_INTERVAL = float(os.environ.get('HEARTBEAT_RESYNC_INTERVAL', '60'))
+
+# Resourcegebruik: per container één Docker stats stream, de laatste RESOURCE_WINDOW samples
+# (~1 per seconde) in een ring buffer. Elke RESOURCE_INTERVAL seconden gaat een samenvatting
+# naar monitoring.stats (schema stats.xsd); 0 = uit.
+RESOURCE_INTERVAL = float(os.environ.get('HEARTBEAT_RESOURCE_INTERVAL', '10'))
+RESOURCE_WINDOW = int(os.environ.get('HEARTBEAT_RESOURCE_WINDOW', '30'))
+
+# Service-probes: per-probe timeout en de latency waarboven een service DEGRADED is
+SERVICE_TIMEOUT = float(os.environ.get('HEARTBEAT_SERVICE_TIMEOUT', '0.7'))
+DEGRADED_LATENCY = float(os.environ.get('HEARTBEAT_DEGRADED_LATENCY', '0.25'))
+
+UP = 'UP'
+DEGRADED = 'DEGRADED'
+DOWN = 'DOWN'
+
+# Metrics: Prometheus-endpoint (poort 0 = uit) en periodieke stats-dump in de log (0 = uit)
+METRICS_PORT = int(os.environ.get('HEARTBEAT_METRICS_PORT', '9102'))
+METRICS_ADDR = os.environ.get('HEARTBEAT_METRICS_ADDR', '0.0.0.0')
+STATS_INTERVAL = float(os.environ.get('HEARTBEAT_STATS_INTERVAL', '60'))
+
+DOCKER_PROBE_LATENCY = Histogram('heartbeat_docker_probe_seconds', 'Duur van een Docker-statuscontrole')
+SERVICE_PROBE_LATENCY = Histogram('heartbeat_service_probe_seconds', 'Latency van service-probes', ['container'])
+TICK_DURATION = Histogram('heartbeat_tick_seconds', 'Duur van een slot (probes + publiceren)')
+TICK_OVERRUNS = Counter('heartbeat_tick_overruns_total', 'Services die hun slot misten', ['container', 'reason'])
+PROBE_FAILURES = Counter('heartbeat_probe_failures_total', 'Mislukte controles per container', ['container', 'reason'])
+SERVICES_BY_STATUS = Gauge('heartbeat_services', 'Aantal gemonitorde services per status', ['status'])
+CONTAINER_CPU = Gauge('heartbeat_container_cpu_percent', 'Gemiddeld CPU-gebruik over het stats-venster', ['container'])
+CONTAINER_MEMORY = Gauge('heartbeat_container_memory_bytes', 'Geheugengebruik zonder page cache', ['container'])
 
 # ANSI kleuren
 GREEN = '\033[92m'
+YELLOW = '\033[93m'
 RED = '\033[91m'
 RESET = '\033[0m'
+STATUS_COLORS = {UP: GREEN, DEGRADED: YELLOW, DOWN: RED}
 
-# Lijst van containers om te monitoren (service naam + poort)
+# Bekende containers (service naam + poort); de lijst voor discovery 'static' en de standaardpoort
+# voor gevonden containers
 SERVICES = [
     ('attendify-frontend-wordpress-1', 80),
     ('attendify-frontend-db-1', 3306),
@@ -41,126 +119,331 @@ SERVICES = [
 
 ]
 
+# Eigen heartbeat-interval (seconden) per container; anders HEARTBEAT_INTERVAL
+SERVICE_INTERVALS = {}
+
+
+def service_defaults():
+    """Poort, probe en interval per bekende container, als basis voor discovery"""
+    defaults = {}
+    for container_name, port in SERVICES:
+        defaults[container_name] = {
+            'port': port,
+            'probe': SERVICE_PROBES.get(container_name),
+            'interval': SERVICE_INTERVALS.get(container_name),
+        }
+    return defaults
+
+
+def static_targets():
+    return [
+        Target(name, port, SERVICE_PROBES.get(name), SERVICE_INTERVALS.get(name, HEARTBEAT_INTERVAL))
+        for name, port in SERVICES
+    ]
+
+# Service-probe per container op de poort uit SERVICES (host = containernaam via Docker DNS).
+# Containers zonder probe worden alleen op hun Docker-status gecontroleerd. Labels
+# attendify.heartbeat.probe/path/port/interval op een container gaan hier boven.
+SERVICE_PROBES = {
+    'attendify-frontend-wordpress-1': {'type': 'http', 'path': '/'},
+    'attendify-frontend-db-1': {
+        'type': 'mysql',
+        'user': os.environ.get('LOCAL_DB_USER'),
+        'password': os.environ.get('LOCAL_DB_PASSWORD'),
+        'database': os.environ.get('LOCAL_DB_NAME'),
+    },
+    'attendify-frontend-phpmyadmin-1': {'type': 'http', 'path': '/'},
+}
+
+docker = DockerClient(DOCKER_SOCKET, pool_size=DOCKER_POOL_SIZE, timeout=2)
+
+
 def check_service_status(container_name):
     """Check de status van de container via Docker API"""
+    start = time.monotonic()
     try:
-        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        client.connect(DOCKER_SOCKET)
-
-        endpoint = f'/containers/{container_name}/json'
-        request = (
-            f"GET {endpoint} HTTP/1.1\r\n"
-            f"Host: localhost\r\n"
-            f"Connection: close\r\n"
-            f"\r\n"
-        )
-
-        client.sendall(request.encode())
-        client.settimeout(2)
-
-        response = b''
-        try:
-            while True:
-                chunk = client.recv(4096)
-                if not chunk:
-                    break
-                response += chunk
-        except socket.timeout:
-            pass
-
-        response = response.decode('utf-8')
-
-        parts = response.split('\r\n\r\n', 1)
-        if len(parts) != 2:
-            logging.error(f"Invalid HTTP response from Docker when checking {container_name}")
-            return False
-        headers, body = parts
-
-        start = body.find('{')
-        end = body.rfind('}') + 1
-        json_data = body[start:end]
-
-        container_info = json.loads(json_data)
-
-        if container_info.get('State', {}).get('Status') == 'running':
-            return True
-        return False
-
+        status, container_info = docker.get_json(f'/containers/{container_name}/json')
     except Exception as e:
         logging.error(f"Error checking service status for {container_name}: {e}")
         return False
     finally:
-        client.close()
+        DOCKER_PROBE_LATENCY.observe(time.monotonic() - start)
+
+    if status != 200 or not isinstance(container_info, dict):
+        logging.error(f"Docker API gaf status {status} voor {container_name}")
+        return False
+    return container_info.get('State', {}).get('Status') == 'running'
+
+def check_service_probe(target):
+    """Controleer of de service in de container antwoordt, met latency"""
+    options = dict(target.probe)
+    probe_type = options.pop('type')
+    result = run_probe(probe_type, target.name, target.port, SERVICE_TIMEOUT, **options)
+    SERVICE_PROBE_LATENCY.labels(target.name).observe(result.latency)
+    return result
+
+
+def resolve_status(running, service):
+    """Combineer Docker-status en service-probe tot (UP | DEGRADED | DOWN, reden)"""
+    if running is TIMEOUT:
+        return DOWN, 'timeout'
+    if not running:
+        return DOWN, 'not_running'
+    if service is None:
+        return UP, None
+    if service is TIMEOUT:
+        return DOWN, 'service_timeout'
+    if not service.ok:
+        return DOWN, f'service_failed: {service.error}'
+    if service.latency > DEGRADED_LATENCY:
+        return DEGRADED, f'slow: {service.latency * 1000:.0f} ms'
+    return UP, None
+
+
+def log_stats(publisher):
+    """Compacte samenvatting van de metrics in de log"""
+    ticks = TICK_DURATION.labels()
+    mean_tick = ticks.sum / ticks.count if ticks.count else 0.0
+    logging.info(
+        f"stats: ticks={ticks.count} gem_tick={mean_tick * 1000:.1f}ms "
+        f"overruns={TICK_OVERRUNS.total()} probe_failures={PROBE_FAILURES.total()} "
+        f"publisher={publisher.stats}"
+    )
+
 
 def create_heartbeat_message(container_name):
     """Maak een heartbeat XML bericht volgens XSD schema met containernaam als sender"""
-    root = ET.Element('heartbeat')
-    ET.SubElement(root, 'sender').text = container_name
     timestamp = datetime.utcnow().isoformat() + 'Z'
-    ET.SubElement(root, 'timestamp').text = timestamp
+    return render_heartbeat(container_name, timestamp)
 
-    rough_string = ET.tostring(root, encoding='utf-8', method='xml')
-    reparsed = xml.dom.minidom.parseString(rough_string)
-    pretty_xml = reparsed.toprettyxml(indent="  ")
 
-    # Verwijder de eerste regel met XML declaration
-    pretty_xml_no_header = '\n'.join(pretty_xml.split('\n')[1:]).strip()
-    return pretty_xml_no_header.encode('utf-8')  # encode opnieuw naar bytes
+def create_heartbeats_message(statuses, kind):
+    """Maak een geaggregeerd heartbeats-bericht met (sender, status) per container"""
+    timestamp = datetime.utcnow().isoformat() + 'Z'
+    return render_heartbeats(statuses, timestamp, kind)
 
 
+def create_stats_message(summaries):
+    """Maak een stats-bericht met het resourcegebruik per container"""
+    timestamp = datetime.utcnow().isoformat() + 'Z'
+    return render_stats(summaries, timestamp)
 
-def main():
-    credentials = pika.PlainCredentials(username=RABBITMQ_USERNAME, password=RABBITMQ_PASSWORD)
 
-    # Retry RabbitMQ verbinding (max 5 keer proberen, telkens 5 seconden wachten)
-    for i in range(5):
-        try:
-            connection = pika.BlockingConnection(
-                pika.ConnectionParameters(
-                    host=RABBITMQ_HOST,
-                    port=RABBITMQ_PORT,
-                    credentials=credentials,
-                    virtual_host=RABBITMQ_VHOST
-                )
-            )
-            break  # Verbinding gelukt
-        except Exception as e:
-            print(f"RabbitMQ verbinding mislukt ({i+1}/5): {e}")
-            time.sleep(5)
-    else:
-        print("RabbitMQ is niet bereikbaar na 5 pogingen. Script stopt.")
+def publish_stats(collector, publisher):
+    """Publiceer de samenvatting van de stats streams en werk de gauges bij"""
+    summaries = collector.summaries()
+    if not summaries:
         return
+    for name, summary in summaries.items():
+        if summary.cpu_avg is not None:
+            CONTAINER_CPU.labels(name).set(summary.cpu_avg)
+        CONTAINER_MEMORY.labels(name).set(summary.memory)
+    publisher.publish_batch([(STATS_ROUTING_KEY, create_stats_message(summaries))])
+
+
+def sync_schedule(scheduler, monitor, current, discovered):
+    """Plan nieuwe of gewijzigde targets in en haal verdwenen targets uit de planning"""
+    updated = {target.name: target for target in discovered}
+    for name, target in current.items():
+        if name not in updated:
+            scheduler.remove(name)
+            monitor.forget(name)
+    for name, target in updated.items():
+        previous = current.get(name)
+        if previous is None or previous.interval != target.interval:
+            scheduler.add(name, target.interval, jitter=HEARTBEAT_JITTER)
+    return updated
+
+
+def log_slot_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        logging.error(f"Fout tijdens heartbeat-slot: {future.exception()!r}")
+
+
+class HeartbeatMonitor:
+    """Controleert een groep services en publiceert heartbeats voor wie leeft"""
+
+    def __init__(self, engine, publisher, state_cache=None, publish_mode='per-container'):
+        self._engine = engine
+        self._publisher = publisher
+        self._state_cache = state_cache
+        self._publish_mode = publish_mode
+        self._status = {}
+        self._lock = threading.Lock()
+
+    def check(self, targets):
+        """Eén slot: probe de targets parallel, log statuswijzigingen en publiceer de batch"""
+        slot_start = time.monotonic()
+        state_cache = self._state_cache
+        by_name = {target.name: target for target in targets}
+
+        def run_target(key):
+            kind, container_name = key
+            if kind == 'docker':
+                return check_service_status(container_name)
+            return check_service_probe(by_name[container_name])
+
+        keys = [('service', target.name) for target in targets if target.probe]
+        use_cache = state_cache is not None and state_cache.ready()
+        if not use_cache:
+            # Geen (verbonden) cache: Docker-status pollen, parallel met de service-probes
+            keys += [('docker', target.name) for target in targets]
+        results = self._engine.run(keys, run_target)
+
+        batch = []
+        transitions = []
+        for target in targets:
+            container_name = target.name
+            if use_cache:
+                running = state_cache.is_running(container_name)
+            else:
+                running = results[('docker', container_name)]
+            status, reason = resolve_status(running, results.get(('service', container_name)))
+            if status == DOWN:
+                PROBE_FAILURES.labels(container_name, reason.split(':', 1)[0]).inc()
+
+            # Alleen statuswijzigingen loggen
+            with self._lock:
+                previous = self._status.get(container_name)
+                self._status[container_name] = status
+            if previous != status:
+                transitions.append((container_name, status))
+                status_text = f"{STATUS_COLORS[status]}{status}{RESET}"
+                logging.info(f"{container_name}: {status_text}" + (f" ({reason})" if reason else ""))
+
+            # Ook een trage (DEGRADED) service leeft nog en krijgt een heartbeat
+            if status != DOWN and self._publish_mode == 'per-container':
+                batch.append((ROUTING_KEY, create_heartbeat_message(container_name)))
+
+        if transitions and self._publish_mode == 'transitions':
+            batch.append((ROUTING_KEY, create_heartbeats_message(transitions, 'transition')))
+        if batch:
+            self._publisher.publish_batch(batch)
+        self._update_gauges()
+        TICK_DURATION.observe(time.monotonic() - slot_start)
+
+    def publish_summary(self):
+        """Eén bericht met de laatst bekende status van alle gemonitorde containers"""
+        with self._lock:
+            statuses = sorted(self._status.items())
+        self._publisher.publish_batch([(ROUTING_KEY, create_heartbeats_message(statuses, 'summary'))])
+
+    def forget(self, container_name):
+        """Container wordt niet meer gemonitord"""
+        with self._lock:
+            self._status.pop(container_name, None)
+        self._update_gauges()
+
+    def _update_gauges(self):
+        with self._lock:
+            statuses = list(self._status.values())
+        for status in (UP, DEGRADED, DOWN):
+            SERVICES_BY_STATUS.labels(status).set(statuses.count(status))
 
-    channel = connection.channel()
 
-    logging.info(f"Starting heartbeat monitor for services: {[service[0] for service in SERVICES]}")
+def main():
+    credentials = pika.PlainCredentials(username=RABBITMQ_USERNAME, password=RABBITMQ_PASSWORD)
+    parameters = pika.ConnectionParameters(
+        host=RABBITMQ_HOST,
+        port=RABBITMQ_PORT,
+        credentials=credentials,
+        virtual_host=RABBITMQ_VHOST
+    )
+
+    # Publiceren gebeurt op een eigen thread die zelf herverbindt; de outbox vangt storingen op
+    publisher = HeartbeatPublisher(parameters, EXCHANGE_NAME, max_outbox=OUTBOX_SIZE, max_age=MAX_MESSAGE_AGE)
+    publisher.start()
+
+    engine = ProbeEngine(max_workers=PROBE_MAX_WORKERS, deadline=PROBE_DEADLINE)
+
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT, METRICS_ADDR)
+        logging.info(f"Metrics beschikbaar op http://{METRICS_ADDR}:{METRICS_PORT}/metrics")
+    next_stats = time.monotonic() + STATS_INTERVAL
+
+    state_cache = None
+    if HEARTBEAT_MODE == 'events':
+        state_cache = ContainerStateCache(docker, resync_interval=RESYNC_INTERVAL)
+        state_cache.start()
+
+    discovery = ContainerDiscovery(
+        docker, mode=DISCOVERY_MODE, project=COMPOSE_PROJECT, exclude=EXCLUDE_SERVICES,
+        defaults=service_defaults(), static_targets=static_targets(), default_interval=HEARTBEAT_INTERVAL,
+        shard_index=SHARD_INDEX, shard_count=SHARD_COUNT, refresh_interval=DISCOVERY_INTERVAL,
+    )
+    discovery.start()
+
+    stats_collector = None
+    if RESOURCE_INTERVAL:
+        stats_collector = ContainerStatsCollector(docker, window=RESOURCE_WINDOW)
+    next_resources = time.monotonic() + RESOURCE_INTERVAL
+    logging.info(f"Starting heartbeat monitor ({DISCOVERY_MODE}, {PUBLISH_MODE}, shard {SHARD_INDEX + 1}/{SHARD_COUNT}) "
+                 f"for services: {[target.name for target in discovery.targets()]}")
+
+    monitor = HeartbeatMonitor(engine, publisher, state_cache, publish_mode=PUBLISH_MODE)
+    next_summary = time.monotonic() + SUMMARY_INTERVAL
+    scheduler = Scheduler(overrun_tolerance=OVERRUN_TOLERANCE)
+    targets = {}
+    discovery_version = None
+
+    # Slots draaien op een eigen pool, zodat trage probes de planner niet ophouden
+    slots = ThreadPoolExecutor(max_workers=SLOT_WORKERS, thread_name_prefix='slot')
+    inflight = {}
 
     try:
         while True:
-            all_running = True
-            for container_name, port in SERVICES:
-                status = check_service_status(container_name)
-                if not status:
-                    all_running = False
-                color = GREEN if status else RED
-                status_text = f"{color}{'UP' if status else 'DOWN'}{RESET}"
-
-                if status:
-                    message = create_heartbeat_message(container_name)
-                    channel.basic_publish(
-                        exchange=EXCHANGE_NAME,
-                        routing_key=ROUTING_KEY,
-                        body=message,
-                        properties=pika.BasicProperties(delivery_mode=2)
-                    )
-
-
-
-            time.sleep(1)
+            if discovery.version != discovery_version:
+                discovery_version = discovery.version
+                targets = sync_schedule(scheduler, monitor, targets, discovery.targets())
+                if stats_collector is not None:
+                    stats_collector.sync(targets)
+
+            due_jobs = scheduler.wait_due(timeout=1.0)
+
+            services = []
+            for job in due_jobs:
+                if scheduler.is_overrun(job):
+                    TICK_OVERRUNS.labels(job.key, 'late').inc()
+                    logging.warning(f"{job.key} {job.lateness * 1000:.0f} ms te laat, "
+                                    f"{job.skipped} slot(s) overgeslagen")
+                previous = inflight.get(job.key)
+                if previous is not None and not previous.done():
+                    # Vorige controle loopt nog: dit slot overslaan in plaats van op te stapelen
+                    TICK_OVERRUNS.labels(job.key, 'busy').inc()
+                    logging.warning(f"{job.key}: vorige controle nog bezig, slot overgeslagen")
+                    continue
+                if job.key in targets:
+                    services.append(targets[job.key])
+
+            if services:
+                future = slots.submit(monitor.check, services)
+                future.add_done_callback(log_slot_error)
+                for target in services:
+                    inflight[target.name] = future
+
+            if PUBLISH_MODE == 'transitions' and time.monotonic() >= next_summary:
+                monitor.publish_summary()
+                next_summary += SUMMARY_INTERVAL
+
+            if stats_collector is not None and time.monotonic() >= next_resources:
+                publish_stats(stats_collector, publisher)
+                next_resources += RESOURCE_INTERVAL
+
+            if STATS_INTERVAL and time.monotonic() >= next_stats:
+                log_stats(publisher)
+                next_stats += STATS_INTERVAL
     except KeyboardInterrupt:
         logging.info("Heartbeat monitor gestopt door gebruiker")
     finally:
-        connection.close()
+        discovery.stop()
+        if stats_collector is not None:
+            stats_collector.stop()
+        if state_cache is not None:
+            state_cache.stop()
+        slots.shutdown(wait=False, cancel_futures=True)
+        engine.shutdown()
+        docker.close()
+        publisher.stop()
 
 
 if __name__ == "__main__":
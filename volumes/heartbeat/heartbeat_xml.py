@@ -0,0 +1,130 @@
+from functools import lru_cache
+from xml.parsers import expat
+
+# Zelfde uitvoer als ElementTree + minidom.toprettyxml(indent="  ") zonder XML declaration,
+# maar zonder per bericht een boom op te bouwen, te herparsen en op te maken.
+_HEARTBEAT_HEAD = '<heartbeat>\n  '
+_HEARTBEAT_TIMESTAMP = '\n  <timestamp>'
+_HEARTBEAT_TAIL = '</timestamp>\n</heartbeat>'
+
+
+def escape_text(text):
+    """Escape tekst zoals minidom dat doet (incl. normalisatie van regeleindes)"""
+    return (text.replace('\r\n', '\n').replace('\r', '\n')
+            .replace('&', '&amp;').replace('<', '&lt;')
+            .replace('>', '&gt;').replace('"', '&quot;'))
+
+
+def element(tag, text):
+    """Eén element met tekst; leeg wordt een self-closing tag zoals bij minidom"""
+    if not text:
+        return f'<{tag}/>'
+    return f'<{tag}>{escape_text(text)}</{tag}>'
+
+
+@lru_cache(maxsize=1024)
+def heartbeat_template(sender):
+    """Vooraf opgebouwde bytes voor en na de timestamp van één sender"""
+    prefix = _HEARTBEAT_HEAD + element('sender', sender) + _HEARTBEAT_TIMESTAMP
+    return prefix.encode('utf-8'), _HEARTBEAT_TAIL.encode('utf-8')
+
+
+def render_heartbeat(sender, timestamp):
+    """Heartbeat-bericht voor sender; alleen de timestamp wordt per bericht ingevuld"""
+    prefix, suffix = heartbeat_template(sender)
+    return prefix + escape_text(timestamp).encode('utf-8') + suffix
+
+
+def render_heartbeats(statuses, timestamp, kind='summary'):
+    """Geaggregeerd bericht met de status van meerdere senders (schema heartbeats.xsd).
+
+    statuses is een lijst (sender, status); kind is 'summary' voor het periodieke
+    overzicht of 'transition' voor statuswijzigingen.
+    """
+    parts = [f'<heartbeats type="{escape_text(kind)}">\n  ', element('timestamp', timestamp)]
+    for sender, status in statuses:
+        parts.append(f'\n  <sender status="{escape_text(status)}">{escape_text(sender)}</sender>')
+    parts.append('\n</heartbeats>')
+    return ''.join(parts).encode('utf-8')
+
+
+def render_failure(sender, reason, last_seen, timestamp):
+    """Foutmelding voor een sender die niet meer leeft (schema failure.xsd)"""
+    return ('<failure>\n  ' + element('sender', sender)
+            + '\n  ' + element('reason', reason)
+            + '\n  ' + element('last_seen', last_seen)
+            + '\n  ' + element('timestamp', timestamp)
+            + '\n</failure>').encode('utf-8')
+
+
+def _attributes(**values):
+    """Attributen met een waarde; getallen met één decimaal, ontbrekende waarden weggelaten"""
+    return ''.join(
+        f' {name}="{value:.1f}"' if isinstance(value, float) else f' {name}="{value}"'
+        for name, value in values.items() if value is not None
+    )
+
+
+def render_stats(summaries, timestamp):
+    """Resourcegebruik per container (schema stats.xsd); summaries is {naam: ResourceSummary}"""
+    parts = ['<stats>\n  ', element('timestamp', timestamp)]
+    for name, summary in summaries.items():
+        parts.append(f'\n  <container name="{escape_text(name)}" samples="{summary.samples}">')
+        if summary.cpu_avg is not None:
+            parts.append(f'\n    <cpu{_attributes(avg=summary.cpu_avg, max=summary.cpu_max)}/>')
+        parts.append(f'\n    <memory{_attributes(used=summary.memory, max=summary.memory_max, limit=summary.memory_limit)}/>')
+        if summary.rx_rate is not None:
+            parts.append(f'\n    <network{_attributes(rx=summary.rx_rate, tx=summary.tx_rate)}/>')
+        parts.append('\n  </container>')
+    parts.append('\n</stats>')
+    return ''.join(parts).encode('utf-8')
+
+
+class HeartbeatParseError(ValueError):
+    pass
+
+
+def parse_heartbeat(body):
+    """Lees beide heartbeat-formaten in één streaming pass (expat, zonder boom).
+
+    Geeft (timestamp, [(sender, status)], kind): een losse <heartbeat> betekent dat de
+    sender leeft (UP) en heeft kind 'heartbeat', een <heartbeats> bevat de status per
+    sender en heeft als kind zijn type ('summary' of 'transition').
+    """
+    senders = []
+    state = {'root': None, 'kind': None, 'timestamp': None, 'status': None, 'text': None}
+
+    def start(tag, attributes):
+        if state['root'] is None:
+            if tag not in ('heartbeat', 'heartbeats'):
+                raise HeartbeatParseError(f"Onbekend root-element {tag}")
+            state['root'] = tag
+            state['kind'] = 'heartbeat' if tag == 'heartbeat' else attributes.get('type', 'summary')
+        elif tag in ('sender', 'timestamp'):
+            state['status'] = attributes.get('status', 'UP')
+            state['text'] = []
+
+    def end(tag):
+        text = state['text']
+        if text is None:
+            return
+        state['text'] = None
+        value = ''.join(text).strip()
+        if tag == 'timestamp':
+            state['timestamp'] = value
+        elif value:
+            senders.append((value, state['status']))
+
+    def data(chunk):
+        if state['text'] is not None:
+            state['text'].append(chunk)
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = data
+    try:
+        parser.Parse(body, True)
+    except expat.ExpatError as e:
+        raise HeartbeatParseError(str(e)) from e
+    return state['timestamp'], senders, state['kind']
@@ -0,0 +1,54 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Markering voor een probe die niet binnen de deadline van de tick klaar was
+TIMEOUT = object()
+
+
+class ProbeEngine:
+    """Voert probes gelijktijdig uit op een begrensde thread pool, met een deadline per tick"""
+
+    def __init__(self, max_workers=32, deadline=0.8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='probe')
+        self._deadline = deadline
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def run(self, targets, probe, deadline=None):
+        """Probe alle targets parallel en geef {target: resultaat} terug.
+
+        Een probe die niet binnen de deadline klaar is telt als TIMEOUT voor dat target.
+        Hangt de vorige probe van een target nog, dan wordt er geen nieuwe gestart.
+        """
+        if deadline is None:
+            deadline = self._deadline
+
+        results = {}
+        futures = {}
+        with self._lock:
+            for target in targets:
+                previous = self._inflight.get(target)
+                if previous is not None and not previous.done():
+                    results[target] = TIMEOUT
+                    continue
+                future = self._executor.submit(probe, target)
+                self._inflight[target] = future
+                futures[future] = target
+
+        done, not_done = wait(futures, timeout=deadline)
+
+        for future in done:
+            target = futures[future]
+            try:
+                results[target] = future.result()
+            except Exception as e:
+                logging.error(f"Probe voor {target} faalde: {e}")
+                results[target] = False
+        for future in not_done:
+            results[futures[future]] = TIMEOUT
+
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,91 @@
+import http.client
+import socket
+import time
+from collections import namedtuple
+
+try:
+    import mysql.connector
+except ImportError:  # Alleen nodig voor de MySQL-probe met login
+    mysql = None
+
+# Resultaat van één service-probe; latency in seconden
+ProbeResult = namedtuple('ProbeResult', ['ok', 'latency', 'error'])
+
+
+def tcp_probe(host, port, timeout):
+    """Slaagt als er binnen de timeout een TCP-verbinding opgezet kan worden"""
+    with socket.create_connection((host, port), timeout=timeout):
+        pass
+
+
+def http_probe(host, port, timeout, path='/', expected_status=None):
+    """GET op path; zonder expected_status is elke 2xx/3xx goed"""
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request('GET', path, headers={'User-Agent': 'attendify-heartbeat'})
+        response = conn.getresponse()
+        response.read()
+    finally:
+        conn.close()
+
+    if expected_status is None:
+        if not 200 <= response.status < 400:
+            raise RuntimeError(f"HTTP status {response.status}")
+    elif response.status != expected_status:
+        raise RuntimeError(f"HTTP status {response.status}, verwacht {expected_status}")
+
+
+def mysql_probe(host, port, timeout, user=None, password=None, database=None):
+    """Log in en ping als er credentials zijn, anders alleen de MySQL handshake lezen.
+
+    Een handshake zonder login telt bij MySQL als verbindingsfout; na max_connect_errors
+    keer wordt de host geblokkeerd. Met credentials is de probe dus veiliger.
+    """
+    if user and mysql is not None:
+        conn = mysql.connector.connect(host=host, port=port, user=user, password=password,
+                                       database=database, connection_timeout=max(1, round(timeout)))
+        try:
+            conn.ping()
+        finally:
+            conn.close()
+        return
+
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        header = _recv_exact(sock, 4)
+        length = int.from_bytes(header[:3], 'little')
+        payload = _recv_exact(sock, length)
+
+    if payload[0] == 0xff:
+        # Error packet: 0xff, 2 bytes code, daarna (optioneel '#' + SQL state) de melding
+        code = int.from_bytes(payload[1:3], 'little')
+        message = payload[9:] if payload[3:4] == b'#' else payload[3:]
+        raise RuntimeError(f"MySQL fout {code}: {message.decode('utf-8', 'replace')}")
+    if payload[0] != 10:
+        raise RuntimeError(f"Onbekend MySQL protocol {payload[0]}")
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Verbinding gesloten tijdens handshake")
+        data.extend(chunk)
+    return bytes(data)
+
+
+PROBE_TYPES = {
+    'tcp': tcp_probe,
+    'http': http_probe,
+    'mysql': mysql_probe,
+}
+
+
+def run_probe(probe_type, host, port, timeout, **options):
+    """Voer een probe van het gegeven type uit en meet de latency"""
+    start = time.monotonic()
+    try:
+        PROBE_TYPES[probe_type](host, port, timeout, **options)
+    except Exception as e:
+        return ProbeResult(False, time.monotonic() - start, str(e) or e.__class__.__name__)
+    return ProbeResult(True, time.monotonic() - start, None)
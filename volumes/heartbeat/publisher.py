@@ -0,0 +1,197 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import pika
+
+from metrics import Counter, Histogram
+
+PUBLISH_LATENCY = Histogram('heartbeat_publish_seconds', 'Tijd van outbox tot publisher confirm')
+PUBLISHER_EVENTS = Counter('heartbeat_publisher_total', 'Publisher-gebeurtenissen per soort', ['event'])
+
+
+class HeartbeatPublisher:
+    """Publiceert heartbeats per batch via een eigen I/O-thread met asynchrone publisher confirms.
+
+    Berichten gaan eerst naar een begrensde outbox. Is de broker onbereikbaar, dan blijft
+    de outbox gevuld (bij een volle outbox valt het oudste bericht weg) en wordt er met
+    exponentiële backoff en jitter opnieuw verbonden. Berichten ouder dan max_age worden
+    daarna niet meer verstuurd, zodat een herstelde broker niet overspoeld wordt.
+    """
+
+    def __init__(self, parameters, exchange, max_outbox=10000, max_age=5.0,
+                 backoff_min=0.5, backoff_max=30.0):
+        self._parameters = parameters
+        self._exchange = exchange
+        self._max_outbox = max_outbox
+        self._max_age = max_age
+        self._backoff_min = backoff_min
+        self._backoff_max = backoff_max
+        self._properties = pika.BasicProperties(delivery_mode=2)
+
+        self._outbox = deque()
+        self._lock = threading.Lock()
+        self._unconfirmed = {}
+        self._delivery_tag = 0
+        self._connection = None
+        self._channel = None
+        self._attempt = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.stats = {
+            'published': 0,
+            'confirmed': 0,
+            'nacked': 0,
+            'dropped_stale': 0,
+            'dropped_overflow': 0,
+            'reconnects': 0,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='publisher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._call(self._close)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def publish_batch(self, messages):
+        """Zet een batch (routing_key, body) in de outbox en laat de I/O-thread hem versturen"""
+        created = time.monotonic()
+        with self._lock:
+            for routing_key, body in messages:
+                if len(self._outbox) >= self._max_outbox:
+                    self._outbox.popleft()
+                    self._count('dropped_overflow')
+                self._outbox.append((created, routing_key, body))
+        self._call(self._flush)
+
+    def _count(self, event, amount=1):
+        self.stats[event] += amount
+        PUBLISHER_EVENTS.labels(event).inc(amount)
+
+    def _call(self, callback):
+        """Voer callback uit op de I/O-thread (als er een verbinding is)"""
+        connection = self._connection
+        if connection is None:
+            return
+        try:
+            connection.ioloop.add_callback_threadsafe(callback)
+        except Exception:
+            # Verbinding wordt net afgebroken; _run pakt de outbox na herverbinden op
+            pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._connection = pika.SelectConnection(
+                self._parameters,
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_open_error,
+                on_close_callback=self._on_connection_closed,
+            )
+            self._connection.ioloop.start()
+            self._connection = None
+            self._channel = None
+            self._requeue_unconfirmed()
+
+            if self._stop.is_set():
+                break
+            delay = min(self._backoff_max, self._backoff_min * (2 ** self._attempt))
+            delay = random.uniform(delay / 2, delay)
+            self._attempt += 1
+            self._count('reconnects')
+            logging.warning(f"RabbitMQ niet beschikbaar, nieuwe poging over {delay:.1f}s")
+            self._stop.wait(delay)
+
+    def _close(self):
+        if self._connection is not None and self._connection.is_open:
+            self._connection.close()
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_open_error(self, connection, error):
+        logging.error(f"RabbitMQ verbinding mislukt: {error!r}")
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        self._channel = None
+        if not self._stop.is_set():
+            logging.warning(f"RabbitMQ verbinding verbroken: {reason}")
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel):
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.confirm_delivery(ack_nack_callback=self._on_confirm,
+                                 callback=lambda frame: self._on_confirm_mode(channel))
+
+    def _on_channel_closed(self, channel, reason):
+        self._channel = None
+        logging.warning(f"RabbitMQ kanaal gesloten: {reason}")
+        self._close()
+
+    def _on_confirm_mode(self, channel):
+        self._channel = channel
+        self._delivery_tag = 0
+        self._attempt = 0
+        logging.info("Verbonden met RabbitMQ, publisher confirms actief")
+        self._flush()
+
+    def _flush(self):
+        channel = self._channel
+        if channel is None or not channel.is_open:
+            return
+        with self._lock:
+            batch = list(self._outbox)
+            self._outbox.clear()
+
+        oldest = time.monotonic() - self._max_age
+        for message in batch:
+            created, routing_key, body = message
+            if created < oldest:
+                self._count('dropped_stale')
+                continue
+            channel.basic_publish(exchange=self._exchange, routing_key=routing_key,
+                                  body=body, properties=self._properties)
+            self._delivery_tag += 1
+            self._unconfirmed[self._delivery_tag] = message
+            self._count('published')
+
+    def _on_confirm(self, frame):
+        method = frame.method
+        if method.multiple:
+            tags = []
+            for tag in self._unconfirmed:
+                if tag > method.delivery_tag:
+                    break
+                tags.append(tag)
+        else:
+            tags = [method.delivery_tag]
+
+        messages = [self._unconfirmed.pop(tag) for tag in tags if tag in self._unconfirmed]
+        if isinstance(method, pika.spec.Basic.Ack):
+            now = time.monotonic()
+            for created, _, _ in messages:
+                PUBLISH_LATENCY.observe(now - created)
+            self._count('confirmed', len(messages))
+            return
+
+        # Nack: bij de volgende flush opnieuw proberen, tenzij het bericht dan te oud is
+        self._count('nacked', len(messages))
+        with self._lock:
+            self._outbox.extendleft(reversed(messages))
+
+    def _requeue_unconfirmed(self):
+        """Niet-bevestigde berichten vooraan in de outbox zetten na een verbroken verbinding"""
+        messages = list(self._unconfirmed.values())
+        self._unconfirmed.clear()
+        with self._lock:
+            self._outbox.extendleft(reversed(messages))
+            while len(self._outbox) > self._max_outbox:
+                self._outbox.popleft()
+                self._count('dropped_overflow')
@@ -0,0 +1,122 @@
+import heapq
+import random
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+# Een job die aan de beurt is; lateness in seconden, skipped = gemiste slots
+DueJob = namedtuple('DueJob', ['key', 'lateness', 'skipped'])
+
+
+class _Job:
+    __slots__ = ('key', 'interval', 'base', 'jitter', 'index', 'due', 'cancelled')
+
+    def __init__(self, key, interval, base, jitter):
+        self.key = key
+        self.interval = interval
+        self.base = base
+        self.jitter = jitter
+        self.index = 0
+        self.due = base
+        self.cancelled = False
+
+    def slot(self, index):
+        """Tijdstip van slot index: vast rooster vanaf base, plus jitter die niet doorwerkt"""
+        jitter = random.uniform(0, self.jitter) if self.jitter else 0.0
+        return self.base + index * self.interval + jitter
+
+
+def spread_offset(key, interval):
+    """Vaste startoffset binnen het interval, afgeleid van de key, zodat jobs niet tegelijk vallen"""
+    return (zlib.crc32(str(key).encode('utf-8')) / 0xffffffff) * interval
+
+
+class Scheduler:
+    """Drift-vrije planner op de monotone klok, met een heap van jobs.
+
+    Elke job draait op een vast rooster (start + n * interval), dus de duur van het
+    werk schuift de volgende slots niet op. Een job die later dan overrun_tolerance
+    aan de beurt komt wordt als overrun gemeld; gemiste slots worden overgeslagen
+    in plaats van ingehaald.
+    """
+
+    def __init__(self, overrun_tolerance=0.1, clock=time.monotonic):
+        self._overrun_tolerance = overrun_tolerance
+        self._clock = clock
+        self._heap = []
+        self._jobs = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+
+    def add(self, key, interval, offset=None, jitter=0.0):
+        """Plan key elke interval seconden; zonder offset wordt hij over het interval gespreid"""
+        if offset is None:
+            offset = spread_offset(key, interval)
+        with self._lock:
+            if key in self._jobs:
+                self._jobs[key].cancelled = True
+            job = _Job(key, interval, self._clock() + offset, jitter)
+            job.due = job.slot(0)
+            self._jobs[key] = job
+            self._push(job)
+        self._changed.set()
+
+    def remove(self, key):
+        with self._lock:
+            job = self._jobs.pop(key, None)
+            if job is not None:
+                job.cancelled = True
+
+    def keys(self):
+        with self._lock:
+            return list(self._jobs)
+
+    def _push(self, job):
+        self._sequence += 1
+        heapq.heappush(self._heap, (job.due, self._sequence, job))
+
+    def wait_due(self, timeout=None):
+        """Wacht tot er jobs aan de beurt zijn en geef ze terug als DueJob-lijst"""
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            with self._lock:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                now = self._clock()
+                if self._heap and self._heap[0][0] <= now:
+                    return self._pop_due(now)
+                wait = self._heap[0][0] - now if self._heap else None
+                self._changed.clear()
+
+            if deadline is not None:
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    return []
+                wait = remaining if wait is None else min(wait, remaining)
+            self._changed.wait(wait)
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, job = heapq.heappop(self._heap)
+            if job.cancelled:
+                continue
+            lateness = now - job.due
+
+            # Volgende slot op het rooster; bij een overrun de gemiste slots overslaan
+            next_index = job.index + 1
+            skipped = 0
+            if lateness > self._overrun_tolerance:
+                next_index = max(next_index, int((now - job.base) // job.interval) + 1)
+                skipped = next_index - job.index - 1
+            job.index = next_index
+            job.due = job.slot(next_index)
+            self._push(job)
+
+            due.append(DueJob(job.key, lateness, skipped))
+        return due
+
+    def is_overrun(self, due_job):
+        return due_job.lateness > self._overrun_tolerance
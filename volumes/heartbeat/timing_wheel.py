@@ -0,0 +1,49 @@
+import time
+
+
+class TimingWheel:
+    """Hashed timing wheel: timers in O(1) plannen en laten aflopen.
+
+    Een timer komt in het slot van zijn tick (deadline / tick) modulo het aantal slots.
+    advance() loopt alleen de slots langs van de ticks die sinds de vorige aanroep
+    verstreken zijn en geeft de keys terug waarvan de tick bereikt is; timers voor een
+    latere ronde blijven in hun slot staan. Annuleren is aan de aanroeper: die negeert
+    een key die niet meer geldig is.
+    """
+
+    def __init__(self, tick=0.1, size=512, clock=time.monotonic):
+        self._tick = tick
+        self._size = size
+        self._slots = [[] for _ in range(size)]
+        self._current = int(clock() / tick)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def schedule(self, key, deadline):
+        """Plan key op deadline (zelfde klok als advance); nooit eerder dan de volgende tick"""
+        tick = max(int(deadline / self._tick), self._current + 1)
+        self._slots[tick % self._size].append((tick, key))
+        self._count += 1
+
+    def advance(self, now):
+        """Verwerk alle ticks tot now en geef de keys die afgelopen zijn"""
+        target = int(now / self._tick)
+        expired = []
+        # Meer dan een volle ronde achter: elk slot hoeft maar één keer bekeken te worden
+        start = max(self._current + 1, target - self._size + 1)
+        for tick in range(start, target + 1):
+            slot = self._slots[tick % self._size]
+            if not slot:
+                continue
+            keep = []
+            for entry in slot:
+                if entry[0] <= target:
+                    expired.append(entry[1])
+                else:
+                    keep.append(entry)
+            self._slots[tick % self._size] = keep
+        self._current = max(self._current, target)
+        self._count -= len(expired)
+        return expired
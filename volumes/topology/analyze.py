@@ -0,0 +1,309 @@
+"""Fan-out en schrijfversterking van de topologie in topology.json.
+
+Rekent per exchange en routing key uit naar hoeveel queues een publicatie gekopieerd wordt
+en hoeveel bytes per seconde de broker daardoor wegschrijft, bij een publicatieprofiel.
+Meldt hot spots, queues met identieke bindings (kandidaten om één stream te delen),
+bindings waar in het profiel niets op binnenkomt en routes die nergens aankomen.
+
+    python3 analyze.py                          # elke letterlijke binding key met --rate/--size
+    python3 analyze.py --profile rates.json     # echte rates per route
+    python3 analyze.py --json > analyse.json
+
+Een profiel is JSON met per route exchange, routing_key, rate (berichten/s) en size (bytes):
+
+    {"routes": [{"exchange": "event", "routing_key": "event.create", "rate": 20, "size": 4096}]}
+
+Schattingen voor persistente berichten: een classic queue zet berichten kleiner dan
+EMBED_BELOW in zijn eigen index, grotere één keer in de gedeelde message store met per
+queue een index-entry. Quorum queues en streams schrijven per queue een kopie op elke replica.
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict, namedtuple
+
+from configure import TOPOLOGY_FILE
+from topology import load_topology, topic_matches
+
+Route = namedtuple('Route', ['exchange', 'routing_key', 'rate', 'size'])
+RouteLoad = namedtuple('RouteLoad', ['route', 'queues', 'published', 'persisted'])
+
+# queue_index_embed_msgs_below van RabbitMQ en de grootte van een index-entry (classic queues v2)
+EMBED_BELOW = 4096
+INDEX_ENTRY = 32
+
+DEFAULT_RATE = 1.0
+DEFAULT_SIZE = 1024
+DEFAULT_REPLICAS = 3
+
+
+def queue_type(queue):
+    return queue.arguments.get('x-queue-type', 'classic')
+
+
+def dead_letter_exchanges(topology):
+    """Exchanges waar alleen de broker naar dead-lettert; daar publiceert geen producer"""
+    names = {policy.definition.get('dead-letter-exchange') for policy in topology.policies.values()}
+    names.update(queue.arguments.get('x-dead-letter-exchange') for queue in topology.queues.values())
+    names.discard(None)
+    return names
+
+
+def binding_matches(exchange_type, binding_key, routing_key):
+    if exchange_type == 'fanout':
+        return True
+    if exchange_type == 'topic':
+        return topic_matches(binding_key, routing_key)
+    return binding_key == routing_key
+
+
+class Analyzer:
+    """Routeert een profiel door de topologie zoals de broker dat zou doen"""
+
+    def __init__(self, topology, replicas=DEFAULT_REPLICAS):
+        self._topology = topology
+        self._replicas = replicas
+        self._bindings = defaultdict(list)
+        for binding in sorted(topology.bindings):
+            self._bindings[binding.exchange].append(binding)
+
+    def default_routes(self, rate=DEFAULT_RATE, size=DEFAULT_SIZE, exclude=()):
+        """Elke letterlijke binding key als route; wildcards en fanout zeggen niets over wat er gepubliceerd wordt"""
+        routes = set()
+        for exchange, bindings in self._bindings.items():
+            if exchange in exclude or self._topology.exchanges[exchange].type not in ('direct', 'topic'):
+                continue
+            for binding in bindings:
+                if '*' not in binding.routing_key.split('.') and '#' not in binding.routing_key.split('.'):
+                    routes.add(Route(exchange, binding.routing_key, rate, size))
+        return sorted(routes)
+
+    def matching(self, exchange, routing_key):
+        """Bindings die een publicatie op exchange met routing_key raakt"""
+        if exchange == '':
+            return []
+        exchange_type = self._topology.exchanges[exchange].type
+        return [binding for binding in self._bindings.get(exchange, ())
+                if binding_matches(exchange_type, binding.routing_key, routing_key)]
+
+    def queues_for(self, exchange, routing_key):
+        if exchange == '':
+            # Default exchange: de routing key is de queuenaam
+            return [routing_key] if routing_key in self._topology.queues else []
+        return sorted({binding.queue for binding in self.matching(exchange, routing_key)})
+
+    def persisted_bytes(self, queues, size):
+        """Bytes per bericht die de broker wegschrijft voor een kopie in elk van queues"""
+        classic = [name for name in queues
+                   if queue_type(self._topology.queues[name]) == 'classic' and self._topology.queues[name].durable]
+        replicated = [name for name in queues if queue_type(self._topology.queues[name]) != 'classic']
+        if size < EMBED_BELOW:
+            written = len(classic) * (size + INDEX_ENTRY)
+        else:
+            written = (size if classic else 0) + len(classic) * INDEX_ENTRY
+        return written + len(replicated) * size * self._replicas
+
+    def route_loads(self, routes):
+        loads = []
+        for route in routes:
+            queues = self.queues_for(route.exchange, route.routing_key)
+            loads.append(RouteLoad(route, queues, route.rate * route.size,
+                                   route.rate * self.persisted_bytes(queues, route.size)))
+        return loads
+
+    def queue_loads(self, loads):
+        """Berichten en bytes per seconde die elke queue binnenkrijgt"""
+        result = {name: [0.0, 0.0] for name in self._topology.queues}
+        for load in loads:
+            for name in load.queues:
+                result[name][0] += load.route.rate
+                result[name][1] += load.route.rate * load.route.size
+        return result
+
+    def unused_bindings(self, routes):
+        """Bindings die geen enkele route met rate > 0 raakt, per exchange met verkeer in het profiel"""
+        used = set()
+        exchanges = set()
+        for route in routes:
+            if route.rate > 0:
+                exchanges.add(route.exchange)
+                used.update(self.matching(route.exchange, route.routing_key))
+        return [binding for exchange in sorted(exchanges) for binding in self._bindings.get(exchange, ())
+                if binding not in used]
+
+    def redundant_bindings(self):
+        """Letterlijke bindings die een wildcard-binding op dezelfde queue en exchange al dekt"""
+        redundant = []
+        for exchange, bindings in self._bindings.items():
+            if self._topology.exchanges[exchange].type != 'topic':
+                continue
+            by_queue = defaultdict(list)
+            for binding in bindings:
+                by_queue[binding.queue].append(binding)
+            for queue_bindings in by_queue.values():
+                for binding in queue_bindings:
+                    for other in queue_bindings:
+                        if other is not binding and other.routing_key != binding.routing_key \
+                                and topic_matches(other.routing_key, binding.routing_key):
+                            redundant.append((binding, other))
+                            break
+        return redundant
+
+    def identical_queues(self):
+        """Groepen queues met precies dezelfde bindings: elke publicatie wordt per queue opnieuw opgeslagen"""
+        groups = defaultdict(list)
+        per_queue = defaultdict(set)
+        for binding in self._topology.bindings:
+            per_queue[binding.queue].add((binding.exchange, binding.routing_key))
+        for name, keys in per_queue.items():
+            # Eigen retry-binding (retry.<queue>) telt niet mee: die is per definitie uniek
+            keys = frozenset(key for key in keys if key[1] != f'retry.{name}')
+            if keys:
+                groups[keys].append(name)
+        return sorted(sorted(names) for names in groups.values() if len(names) > 1)
+
+
+def load_profile(path, default_size=DEFAULT_SIZE):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return [Route(item['exchange'], item['routing_key'], float(item.get('rate', DEFAULT_RATE)),
+                  int(item.get('size', data.get('default_size', default_size))))
+            for item in data['routes']]
+
+
+def _rate(value):
+    """Bytes per seconde leesbaar"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(value) < 1024 or unit == 'GB':
+            return f'{value:.0f} {unit}/s' if unit == 'B' else f'{value:.1f} {unit}/s'
+        value /= 1024
+
+
+def analyze(analyzer, routes, fanout_threshold=4, hot_share=0.1, top=20, profiled=True):
+    """Alle bevindingen als dict (ook de basis voor --json).
+
+    Zonder profiel (profiled=False) is niet bekend wat er op wildcard-bindings binnenkomt;
+    ongebruikte bindings en queues zonder verkeer worden dan niet gemeld.
+    """
+    loads = analyzer.route_loads(routes)
+    published = sum(load.published for load in loads)
+    persisted = sum(load.persisted for load in loads)
+    queue_loads = analyzer.queue_loads(loads)
+    return {
+        'totals': {
+            'routes': len(loads),
+            'messages_per_second': sum(load.route.rate for load in loads),
+            'published_bytes_per_second': published,
+            'persisted_bytes_per_second': persisted,
+            'amplification': persisted / published if published else 0.0,
+        },
+        'routes': [{
+            'exchange': load.route.exchange,
+            'routing_key': load.route.routing_key,
+            'rate': load.route.rate,
+            'size': load.route.size,
+            'fanout': len(load.queues),
+            'queues': load.queues,
+            'persisted_bytes_per_second': load.persisted,
+        } for load in sorted(loads, key=lambda load: (-load.persisted, load.route))],
+        'hot_spots': [{
+            'exchange': load.route.exchange,
+            'routing_key': load.route.routing_key,
+            'fanout': len(load.queues),
+            'share': load.persisted / persisted if persisted else 0.0,
+        } for load in sorted(loads, key=lambda load: -load.persisted)
+            if len(load.queues) >= fanout_threshold or (persisted and load.persisted / persisted >= hot_share)],
+        'queues': [{'queue': name, 'messages_per_second': rate, 'bytes_per_second': size}
+                   for name, (rate, size) in sorted(queue_loads.items(), key=lambda item: -item[1][1])[:top]],
+        'idle_queues': sorted(name for name, (rate, _) in queue_loads.items() if not rate) if profiled else [],
+        'unroutable': [{'exchange': load.route.exchange, 'routing_key': load.route.routing_key}
+                       for load in loads if not load.queues and load.route.rate > 0],
+        'unused_bindings': [binding._asdict() for binding in analyzer.unused_bindings(routes)] if profiled else [],
+        'redundant_bindings': [{'binding': binding._asdict(), 'covered_by': other.routing_key}
+                               for binding, other in analyzer.redundant_bindings()],
+        'identical_queues': analyzer.identical_queues(),
+        'profiled': profiled,
+    }
+
+
+def describe(result, top=20):
+    """Het rapport als tekstregels"""
+    totals = result['totals']
+    lines = [
+        f"{totals['routes']} routes, {totals['messages_per_second']:.1f} berichten/s: "
+        f"{_rate(totals['published_bytes_per_second'])} gepubliceerd, "
+        f"{_rate(totals['persisted_bytes_per_second'])} weggeschreven "
+        f"(x{totals['amplification']:.1f})",
+        '',
+        'Fan-out per route (meeste schrijfwerk eerst):',
+    ]
+    for route in result['routes'][:top]:
+        lines.append(f"  {route['exchange']:<16} {route['routing_key']:<28} {route['rate']:>8.1f}/s "
+                     f"{route['size']:>7} B  fan-out {route['fanout']:>2}  {_rate(route['persisted_bytes_per_second']):>12}")
+    if len(result['routes']) > top:
+        lines.append(f"  ... en nog {len(result['routes']) - top}")
+
+    if result['hot_spots']:
+        lines += ['', 'Hot spots:']
+        lines += [f"  {spot['exchange']} [{spot['routing_key']}]: fan-out {spot['fanout']}, "
+                  f"{spot['share'] * 100:.0f}% van het schrijfwerk" for spot in result['hot_spots']]
+
+    lines += ['', 'Drukste queues:']
+    lines += [f"  {queue['queue']:<24} {queue['messages_per_second']:>8.1f}/s  {_rate(queue['bytes_per_second']):>12}"
+              for queue in result['queues'] if queue['messages_per_second']]
+
+    if result['identical_queues']:
+        lines += ['', 'Queues met identieke bindings (één stream met meerdere consumers schrijft elk bericht één keer):']
+        lines += [f"  {', '.join(names)}" for names in result['identical_queues']]
+    if result['unroutable']:
+        lines += ['', 'Routes zonder queue (berichten gaan verloren):']
+        lines += [f"  {route['exchange']} [{route['routing_key']}]" for route in result['unroutable']]
+    if result['unused_bindings']:
+        lines += ['', 'Bindings zonder verkeer in het profiel:']
+        lines += [f"  {b['exchange']} -> {b['queue']} [{b['routing_key']}]" for b in result['unused_bindings']]
+    if result['redundant_bindings']:
+        lines += ['', 'Overbodige bindings (al gedekt door een wildcard):']
+        lines += [f"  {item['binding']['exchange']} -> {item['binding']['queue']} [{item['binding']['routing_key']}] "
+                  f"door [{item['covered_by']}]" for item in result['redundant_bindings']]
+    if result['idle_queues']:
+        lines += ['', f"Queues zonder verkeer in het profiel: {', '.join(result['idle_queues'])}"]
+    if not result['profiled']:
+        lines += ['', 'Zonder --profile: elke letterlijke binding key met dezelfde rate; ongebruikte bindings '
+                      'en queues zonder verkeer zijn alleen met een profiel te bepalen.']
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--file', default=TOPOLOGY_FILE, help='topologiebestand (standaard topology.json)')
+    parser.add_argument('--profile', help='JSON met rate en size per route; anders elke letterlijke binding key')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='berichten/s per route zonder profiel')
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE, help='berichtgrootte in bytes zonder opgave')
+    parser.add_argument('--replicas', type=int, default=DEFAULT_REPLICAS, help='replica\'s van quorum queues en streams')
+    parser.add_argument('--fanout-threshold', type=int, default=4, help='hot spot vanaf deze fan-out')
+    parser.add_argument('--hot-share', type=float, default=0.1, help='hot spot vanaf dit aandeel van het schrijfwerk')
+    parser.add_argument('--top', type=int, default=20, help='aantal routes en queues in het rapport')
+    parser.add_argument('--json', action='store_true', help='resultaat als JSON')
+    args = parser.parse_args(argv)
+
+    topology = load_topology(args.file)
+    analyzer = Analyzer(topology, replicas=args.replicas)
+    if args.profile:
+        routes = load_profile(args.profile, args.size)
+        unknown = sorted({route.exchange for route in routes} - set(topology.exchanges) - {''})
+        if unknown:
+            parser.error(f"profiel noemt onbekende exchange(s): {', '.join(unknown)}")
+    else:
+        routes = analyzer.default_routes(args.rate, args.size, exclude=dead_letter_exchanges(topology))
+
+    result = analyze(analyzer, routes, args.fanout_threshold, args.hot_share, args.top, profiled=bool(args.profile))
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        print('\n'.join(describe(result, args.top)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
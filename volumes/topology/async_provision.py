@@ -0,0 +1,106 @@
+import logging
+from collections import deque
+from functools import partial
+
+import pika
+
+
+class PipelinedProvisioner:
+    """Voert de operaties uit op een SelectConnection met meerdere kanalen tegelijk.
+
+    AMQP staat per kanaal maar één synchrone RPC tegelijk toe, dus de parallelliteit
+    komt uit het aantal kanalen: elk vrij kanaal pakt de volgende operatie van de fase.
+    Een fase begint pas als alle operaties van de vorige bevestigd zijn, zodat queues
+    na hun exchanges en bindings na hun queues komen. Een fout sluit alleen dat kanaal;
+    de operatie telt als mislukt en er wordt een vervangend kanaal geopend.
+    """
+
+    def __init__(self, parameters, channels=16, timeout=120.0):
+        self._parameters = parameters
+        self._channel_count = max(1, channels)
+        self._timeout = timeout
+        self.operations = 0
+        self.failures = 0
+
+    def run(self, phases):
+        self._phases = [list(phase) for phase in phases]
+        self._phase = -1
+        self._queue = deque()
+        self._idle = []
+        self._inflight = {}
+        self._finished = False
+        self._error = None
+
+        self._connection = pika.SelectConnection(
+            self._parameters,
+            on_open_callback=self._on_connection_open,
+            on_open_error_callback=self._on_connection_open_error,
+            on_close_callback=self._on_connection_closed,
+        )
+        self._connection.ioloop.call_later(self._timeout, self._on_timeout)
+        self._connection.ioloop.start()
+        if self._error is not None:
+            raise self._error
+
+    def _on_connection_open(self, connection):
+        for _ in range(self._channel_count):
+            connection.channel(on_open_callback=self._on_channel_open)
+        self._next_phase()
+
+    def _on_connection_open_error(self, connection, error):
+        self._error = error if isinstance(error, Exception) else pika.exceptions.AMQPConnectionError(error)
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        if not self._finished and self._error is None:
+            self._error = reason
+        connection.ioloop.stop()
+
+    def _on_timeout(self):
+        if not self._finished:
+            self._error = TimeoutError(f"Provisioning duurde langer dan {self._timeout:.0f} s")
+            self._finished = True
+            self._connection.close()
+
+    def _on_channel_open(self, channel):
+        channel.add_on_close_callback(self._on_channel_closed)
+        self._idle.append(channel)
+        self._dispatch()
+
+    def _on_channel_closed(self, channel, reason):
+        if channel in self._idle:
+            self._idle.remove(channel)
+        operation = self._inflight.pop(channel.channel_number, None)
+        if self._finished:
+            return
+        if operation is not None:
+            self.failures += 1
+            code = getattr(reason, 'reply_code', '')
+            text = getattr(reason, 'reply_text', reason)
+            logging.error(f"{operation.description} mislukt: {code} {text}")
+        self._connection.channel(on_open_callback=self._on_channel_open)
+        self._dispatch()
+
+    def _on_done(self, channel, frame):
+        self._inflight.pop(channel.channel_number, None)
+        self._idle.append(channel)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._idle and self._queue:
+            channel = self._idle.pop()
+            operation = self._queue.popleft()
+            self._inflight[channel.channel_number] = operation
+            self.operations += 1
+            getattr(channel, operation.method)(callback=partial(self._on_done, channel), **operation.kwargs)
+        if not self._queue and not self._inflight and not self._finished and self._phase >= 0:
+            self._next_phase()
+
+    def _next_phase(self):
+        self._phase += 1
+        if self._phase >= len(self._phases):
+            self._finished = True
+            self._connection.close()
+            return
+        self._queue.extend(self._phases[self._phase])
+        self._dispatch()
@@ -0,0 +1,230 @@
+"""Zet de RabbitMQ-topologie uit topology.json op de broker.
+
+Leest de huidige staat in één call van de management API, berekent het verschil en
+voert alleen de ontbrekende of gewijzigde declaraties uit. Is de management API na
+een paar pogingen nog niet bereikbaar (bv. bij een koude start, AMQP eerder op dan de
+management plugin), dan wordt alles gedeclareerd (declaraties zijn idempotent). Policies
+gaan alleen via die API; die run eindigt daarom met exit 1, zodat de service herstart
+en de policies alsnog gezet worden.
+
+    python3 configure.py              # verschil toepassen
+    python3 configure.py --dry-run    # alleen het plan tonen
+    python3 configure.py --full       # alles declareren zonder de broker te lezen
+
+Standaard lopen de declaraties gepipelined over meerdere kanalen (--mode async);
+--mode blocking doet ze één voor één.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import namedtuple
+
+import pika
+
+from async_provision import PipelinedProvisioner
+from management import ManagementClient, ManagementError
+from topology import Topology, from_definitions, load_topology, plan
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+TOPOLOGY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'topology.json')
+
+RABBITMQ_HOSTNAME = os.getenv('RABBITMQ_HOSTNAME', 'rabbitmq')
+RABBITMQ_AMQP_PORT = int(os.getenv('RABBITMQ_AMQP_PORT') or 5672)
+RABBITMQ_VHOST = os.getenv('RABBITMQ_HOST', '/')
+RABBITMQ_USER = os.getenv('RABBITMQ_USER', 'attendify')
+RABBITMQ_PASSWORD = os.getenv('RABBITMQ_PASSWORD', '')
+# async: declaraties verdeeld over meerdere kanalen tegelijk onderweg; blocking: één voor één
+PROVISION_MODE = os.getenv('TOPOLOGY_PROVISION_MODE', 'async')
+PROVISION_CHANNELS = int(os.getenv('TOPOLOGY_PROVISION_CHANNELS', '16'))
+MANAGEMENT_URL = os.getenv('RABBITMQ_MANAGEMENT_URL',
+                           f"http://{RABBITMQ_HOSTNAME}:{os.getenv('RABBITMQ_PORT') or 15672}")
+# Pogingen om de management API te lezen, met verdubbelende wachttijd vanaf MANAGEMENT_RETRY_DELAY
+MANAGEMENT_RETRIES = int(os.getenv('TOPOLOGY_MANAGEMENT_RETRIES', '5'))
+MANAGEMENT_RETRY_DELAY = float(os.getenv('TOPOLOGY_MANAGEMENT_RETRY_DELAY', '2'))
+
+
+# Eén AMQP-declaratie: omschrijving voor de log, methode op het kanaal en de argumenten
+Operation = namedtuple('Operation', ['description', 'method', 'kwargs'])
+
+
+def declare_exchange(exchange):
+    return Operation(f'exchange {exchange.name}', 'exchange_declare', dict(
+        exchange=exchange.name, exchange_type=exchange.type, durable=exchange.durable,
+        auto_delete=exchange.auto_delete, internal=exchange.internal, arguments=exchange.arguments or None))
+
+
+def declare_queue(queue):
+    return Operation(f'queue {queue.name}', 'queue_declare', dict(
+        queue=queue.name, durable=queue.durable, auto_delete=queue.auto_delete, arguments=queue.arguments or None))
+
+
+def bind(binding):
+    return Operation(f'binding {binding.exchange} -> {binding.queue} [{binding.routing_key}]', 'queue_bind',
+                     dict(queue=binding.queue, exchange=binding.exchange, routing_key=binding.routing_key))
+
+
+def unbind(binding):
+    return Operation(f'unbind {binding.exchange} -> {binding.queue} [{binding.routing_key}]', 'queue_unbind',
+                     dict(queue=binding.queue, exchange=binding.exchange, routing_key=binding.routing_key))
+
+
+def build_operations(changes, desired, recreate=False, prune=False):
+    """Zet het plan om in fases die na elkaar moeten: verwijderen, exchanges, queues, bindings, unbinds.
+
+    Binnen een fase hangen de operaties niet van elkaar af en mogen ze tegelijk lopen.
+    """
+    deletes, exchanges, queues = [], [], []
+    bindings = set(changes.bindings)
+
+    exchanges += [declare_exchange(exchange) for exchange in changes.exchanges]
+    for exchange, differences in changes.changed_exchanges:
+        if not recreate:
+            logging.warning(f"exchange {exchange.name} wijkt af ({'; '.join(differences)}), gebruik --recreate")
+            continue
+        deletes.append(Operation(f'delete exchange {exchange.name}', 'exchange_delete', dict(exchange=exchange.name)))
+        exchanges.append(declare_exchange(exchange))
+        bindings.update(b for b in desired.bindings if b.exchange == exchange.name)
+
+    queues += [declare_queue(queue) for queue in changes.queues]
+    for queue, differences in changes.changed_queues:
+        if not recreate:
+            logging.warning(f"queue {queue.name} wijkt af ({'; '.join(differences)}), gebruik --recreate")
+            continue
+        logging.warning(f"queue {queue.name} wordt opnieuw aangemaakt, berichten gaan verloren")
+        deletes.append(Operation(f'delete queue {queue.name}', 'queue_delete', dict(queue=queue.name)))
+        queues.append(declare_queue(queue))
+        bindings.update(b for b in desired.bindings if b.queue == queue.name)
+
+    unbinds = [unbind(binding) for binding in changes.unbind] if prune else []
+    phases = [deletes, exchanges, queues, [bind(binding) for binding in sorted(bindings)], unbinds]
+    return [phase for phase in phases if phase]
+
+
+class Provisioner:
+    """Voert de operaties één voor één uit op een BlockingConnection.
+
+    Een fout sluit het kanaal; dan wordt een nieuw kanaal geopend en gaat het verder.
+    """
+
+    def __init__(self, parameters):
+        self._parameters = parameters
+        self.operations = 0
+        self.failures = 0
+
+    def run(self, phases):
+        connection = pika.BlockingConnection(self._parameters)
+        try:
+            channel = connection.channel()
+            for phase in phases:
+                for operation in phase:
+                    self.operations += 1
+                    try:
+                        getattr(channel, operation.method)(**operation.kwargs)
+                    except pika.exceptions.ChannelClosedByBroker as e:
+                        self.failures += 1
+                        logging.error(f"{operation.description} mislukt: {e.reply_code} {e.reply_text}")
+                        channel = connection.channel()
+        finally:
+            connection.close()
+
+
+def apply_policies(management, changes, prune=False):
+    """Zet nieuwe en gewijzigde policies via de management API; geeft (operaties, mislukt)"""
+    operations = failures = 0
+    actions = [(f'policy {policy.name}', management.put_policy, policy) for policy, _ in changes.policies]
+    if prune:
+        actions += [(f'delete policy {policy.name}', management.delete_policy, policy.name)
+                    for policy in changes.stale_policies]
+    for description, action, argument in actions:
+        operations += 1
+        try:
+            action(argument)
+        except ManagementError as e:
+            failures += 1
+            logging.error(f"{description} mislukt: {e}")
+    return operations, failures
+
+
+def read_current(management, retries=MANAGEMENT_RETRIES, delay=MANAGEMENT_RETRY_DELAY):
+    """Huidige topologie van de broker, of None als de management API niet bereikbaar is"""
+    for attempt in range(1, retries + 1):
+        try:
+            return from_definitions(management.definitions(), RABBITMQ_VHOST)
+        except ManagementError as e:
+            if attempt == retries:
+                logging.warning(f"Kan de huidige topologie niet lezen ({e}), val terug op volledige declaratie")
+                return None
+            logging.info(f"Management API nog niet bereikbaar ({e}), nieuwe poging over {delay:.1f} s")
+            time.sleep(delay)
+            delay *= 2
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--file', default=TOPOLOGY_FILE, help='topologiebestand (standaard topology.json)')
+    parser.add_argument('--dry-run', action='store_true', help='toon het plan zonder iets te wijzigen')
+    parser.add_argument('--full', action='store_true', help='declareer alles zonder de broker te lezen')
+    parser.add_argument('--recreate', action='store_true',
+                        help='verwijder en herdeclareer afwijkende exchanges en queues (queue-inhoud gaat verloren)')
+    parser.add_argument('--prune', action='store_true', help='verwijder bindings die niet in het bestand staan')
+    parser.add_argument('--mode', choices=('async', 'blocking'), default=PROVISION_MODE,
+                        help='async houdt declaraties op meerdere kanalen tegelijk onderweg (standaard)')
+    parser.add_argument('--channels', type=int, default=PROVISION_CHANNELS,
+                        help='aantal kanalen in async-modus')
+    args = parser.parse_args(argv)
+
+    desired = load_topology(args.file)
+    management = ManagementClient(MANAGEMENT_URL, RABBITMQ_USER, RABBITMQ_PASSWORD, RABBITMQ_VHOST)
+    current = None
+    if not args.full:
+        current = read_current(management)
+    changes = plan(desired, current if current is not None else Topology())
+
+    if args.dry_run:
+        for line in changes.describe():
+            print(line)
+        print(f"{len(changes.describe())} wijziging(en)" + ("" if current is not None else " (broker niet gelezen)"))
+        return 0
+
+    if current is not None and changes.is_empty():
+        logging.info("Topologie is al up-to-date")
+        return 0
+
+    skipped = 0
+    if current is None and not args.full:
+        # Lezen mislukte al: elke PUT zou ook mislukken; de declaraties gaan wel door
+        operations = failures = 0
+        skipped = len(changes.policies)
+        if skipped:
+            logging.error(f"Management API niet bereikbaar: {skipped} policy('s) niet gezet, "
+                          f"queues hebben nog geen limieten; exit 1 zodat een herstart het opnieuw probeert")
+    else:
+        # Policies eerst: ze gelden ook voor queues die hierna pas gedeclareerd worden
+        operations, failures = apply_policies(management, changes, prune=args.prune)
+
+    phases = build_operations(changes, desired, recreate=args.recreate, prune=args.prune)
+    if phases:
+        logging.info(f"Topologie toepassen op {RABBITMQ_HOSTNAME}:{RABBITMQ_AMQP_PORT}/{RABBITMQ_VHOST} "
+                     f"({args.mode})...")
+        parameters = pika.ConnectionParameters(
+            RABBITMQ_HOSTNAME, RABBITMQ_AMQP_PORT, RABBITMQ_VHOST,
+            pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASSWORD),
+        )
+        if args.mode == 'async':
+            provisioner = PipelinedProvisioner(parameters, channels=args.channels)
+        else:
+            provisioner = Provisioner(parameters)
+        provisioner.run(phases)
+        operations += provisioner.operations
+        failures += provisioner.failures
+
+    logging.info(f"Klaar: {operations} operatie(s), {failures} mislukt, {skipped} policy('s) overgeslagen")
+    return 1 if failures or skipped else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,360 @@
+"""Speel berichten uit een dead-letter queue opnieuw af naar hun oorspronkelijke bestemming.
+
+Consumeert de DLQ met een ruime prefetch en publiceert elk bericht opnieuw naar de
+exchange en routing key waar het oorspronkelijk heen ging (uit de x-death header, of
+x-original-exchange / x-original-routing-key als de producer die zet). Het origineel
+wordt pas ge-ackt als de broker de nieuwe publicatie bevestigd heeft; die acks gaan
+in batches (multiple=True). Berichten die niet door het filter komen of geen bekende
+bestemming hebben, gaan achteraan de DLQ. Alles gaat uit met mandatory: komt een
+afgespeeld bericht nergens aan (exchange of queue weg, geen binding meer), dan stuurt
+de broker het terug en gaat het origineel achteraan de DLQ in plaats van verloren te
+gaan. De run stopt na de berichten die er bij de start in stonden, zodat teruggezette
+berichten niet opnieuw langskomen.
+
+    python3 dlq_replay.py pos.dlq
+    python3 dlq_replay.py crm.dlq --key 'user.*' --header source=wordpress --rate 2000
+    python3 dlq_replay.py billing.dlq --target queue      # terug naar de queue waar het misging
+"""
+import argparse
+import logging
+import sys
+import time
+from collections import OrderedDict, deque
+
+import pika
+
+from configure import RABBITMQ_AMQP_PORT, RABBITMQ_HOSTNAME, RABBITMQ_PASSWORD, RABBITMQ_USER, RABBITMQ_VHOST
+from topology import topic_matches
+
+REPLAY_COUNT_HEADER = 'x-replay-count'
+# Publish-tag van de replay, om een teruggestuurd bericht aan zijn origineel te koppelen
+REPLAY_TAG_HEADER = 'x-replay-tag'
+PROGRESS_INTERVAL = 5.0
+
+
+def _text(value):
+    return value.decode('utf-8', 'replace') if isinstance(value, bytes) else value
+
+
+def _origin(properties):
+    """(exchange, queue, routing_key) van de oorspronkelijke publicatie; onbekende delen zijn None"""
+    headers = properties.headers or {}
+    deaths = headers.get('x-death')
+    if deaths:
+        # Nieuwste entry eerst; de laatste beschrijft de oorspronkelijke publicatie
+        first = deaths[-1]
+        routing_keys = first.get('routing-keys') or [None]
+        return _text(first.get('exchange')), _text(first.get('queue')), _text(routing_keys[0])
+    return (_text(headers.get('x-original-exchange')), _text(headers.get('x-original-queue')),
+            _text(headers.get('x-original-routing-key')))
+
+
+def original_routing_key(properties):
+    """De routing key waarmee het bericht oorspronkelijk gepubliceerd werd, of None als onbekend"""
+    return _origin(properties)[2]
+
+
+def original_destination(properties, target='original'):
+    """(exchange, routing_key) waar het bericht oorspronkelijk heen ging, of None als onbekend.
+
+    Met target 'queue' is dat de queue waar het bericht dead-lettered werd, via de
+    default exchange, zodat andere abonnees van de routing key het niet nog eens krijgen.
+    """
+    exchange, queue, routing_key = _origin(properties)
+    if target == 'queue':
+        return ('', queue) if queue else None
+    if exchange is None or routing_key is None:
+        return None
+    return exchange, routing_key
+
+
+class TokenBucket:
+    """Rate limit in berichten per seconde, met een burst van één seconde (minstens één bericht)"""
+
+    def __init__(self, rate):
+        self._rate = rate
+        # Onder 1/s zou de bucket nooit een heel token bevatten en stond de replay voorgoed stil
+        self._capacity = max(1.0, rate)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+
+    def take(self):
+        """Neem een token; geeft 0 terug of het aantal seconden tot er weer een is"""
+        if not self._rate:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self._rate
+
+
+class DlqReplayer:
+    """Replay op een SelectConnection: één kanaal consumeert, één publiceert met confirms"""
+
+    def __init__(self, parameters, queue, target='original', prefetch=1000, rate=0.0,
+                 key_pattern=None, headers=None, limit=None, idle_timeout=5.0):
+        self._parameters = parameters
+        self._queue = queue
+        self._target = target
+        self._prefetch = prefetch
+        self._bucket = TokenBucket(rate)
+        self._key_pattern = key_pattern
+        self._headers = headers or {}
+        self._limit = limit
+        self._idle_timeout = idle_timeout
+        self.stats = {'replayed': 0, 'rotated': 0, 'unknown': 0, 'returned': 0, 'failed': 0}
+
+    def run(self):
+        self._connection = None
+        self._consume_channel = None
+        self._publish_channel = None
+        self._remaining = None
+        self._taken = 0
+        self._settled_count = 0
+        self._consumer_tag = None
+        self._pending = deque()
+        self._pump_scheduled = False
+        self._publish_tags = 0
+        self._outstanding = OrderedDict()
+        self._order = deque()
+        self._settled = set()
+        self._returned = set()
+        self._last_activity = time.monotonic()
+        self._started = time.monotonic()
+        self._finished = False
+        self._error = None
+
+        self._connection = pika.SelectConnection(
+            self._parameters,
+            on_open_callback=self._on_connection_open,
+            on_open_error_callback=self._on_connection_open_error,
+            on_close_callback=self._on_connection_closed,
+        )
+        self._connection.ioloop.start()
+        if self._error is not None:
+            raise self._error
+        return self.stats
+
+    # Verbinding en kanalen
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_publish_channel_open)
+
+    def _on_connection_open_error(self, connection, error):
+        self._error = error if isinstance(error, Exception) else pika.exceptions.AMQPConnectionError(error)
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        if not self._finished and self._error is None:
+            self._error = reason
+        connection.ioloop.stop()
+
+    def _on_publish_channel_open(self, channel):
+        self._publish_channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.add_on_return_callback(self._on_return)
+        channel.confirm_delivery(ack_nack_callback=self._on_confirm, callback=self._on_confirm_mode)
+
+    def _on_confirm_mode(self, frame):
+        self._connection.channel(on_open_callback=self._on_consume_channel_open)
+
+    def _on_consume_channel_open(self, channel):
+        self._consume_channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.queue_declare(self._queue, passive=True, callback=self._on_depth)
+
+    def _on_channel_closed(self, channel, reason):
+        if self._finished:
+            return
+        # Niet-bevestigde berichten gaan bij het sluiten vanzelf terug naar de DLQ
+        logging.error(f"Kanaal gesloten: {reason}")
+        self._error = reason if isinstance(reason, Exception) else RuntimeError(str(reason))
+        self._finish()
+
+    def _on_depth(self, frame):
+        depth = frame.method.message_count
+        self._remaining = depth if self._limit is None else min(depth, self._limit)
+        logging.info(f"{self._queue}: {depth} bericht(en), {self._remaining} worden verwerkt")
+        if not self._remaining:
+            self._finish()
+            return
+        self._consume_channel.basic_qos(prefetch_count=self._prefetch, callback=self._on_qos)
+
+    def _on_qos(self, frame):
+        self._consumer_tag = self._consume_channel.basic_consume(self._queue, self._on_message)
+        self._connection.ioloop.call_later(PROGRESS_INTERVAL, self._on_progress)
+
+    # Berichten
+
+    def _on_message(self, channel, method, properties, body):
+        self._last_activity = time.monotonic()
+        if self._finished or self._taken >= self._remaining:
+            # Al binnen via de prefetch maar buiten de run: terug naar de DLQ
+            channel.basic_nack(method.delivery_tag, requeue=True)
+            return
+        self._taken += 1
+        self._order.append(method.delivery_tag)
+        self._pending.append((method.delivery_tag, properties, body))
+        if self._taken >= self._remaining:
+            channel.basic_cancel(self._consumer_tag)
+        self._pump()
+
+    def _matches(self, properties):
+        # Filter op de oorspronkelijke routing key, ook als de bestemming (--target queue) de queue is
+        if self._key_pattern is not None:
+            routing_key = original_routing_key(properties)
+            if routing_key is None or not topic_matches(self._key_pattern, routing_key):
+                return False
+        headers = properties.headers or {}
+        return all(str(_text(headers.get(name))) == value for name, value in self._headers.items())
+
+    def _pump(self):
+        self._pump_scheduled = False
+        while self._pending:
+            delivery_tag, properties, body = self._pending[0]
+            destination = original_destination(properties, self._target)
+            if destination is not None and self._matches(properties):
+                wait = self._bucket.take()
+                if wait:
+                    if not self._pump_scheduled:
+                        self._pump_scheduled = True
+                        self._connection.ioloop.call_later(wait, self._pump)
+                    return
+                exchange, routing_key = destination
+                headers = dict(properties.headers or {})
+                headers[REPLAY_COUNT_HEADER] = int(headers.get(REPLAY_COUNT_HEADER, 0)) + 1
+                properties.headers = headers
+                outcome = 'replayed'
+            else:
+                # Niet voor deze run of bestemming onbekend: achteraan de DLQ
+                exchange, routing_key = '', self._queue
+                outcome = 'rotated' if destination is not None else 'unknown'
+            self._pending.popleft()
+            self._publish(delivery_tag, outcome, exchange, routing_key, properties, body)
+
+    def _publish(self, delivery_tag, outcome, exchange, routing_key, properties, body):
+        self._publish_tags += 1
+        headers = dict(properties.headers or {})
+        headers[REPLAY_TAG_HEADER] = self._publish_tags
+        properties.headers = headers
+        # Geteld pas bij de confirm: een ge-nackte of teruggestuurde publicatie is niet afgespeeld
+        self._outstanding[self._publish_tags] = (delivery_tag, outcome)
+        self._publish_channel.basic_publish(exchange, routing_key, body, properties, mandatory=True)
+
+    def _on_return(self, channel, method, properties, body):
+        """Onrouteerbaar bericht; komt bij de broker altijd vóór de confirm van dezelfde publicatie"""
+        entry = self._outstanding.pop((properties.headers or {}).get(REPLAY_TAG_HEADER), None)
+        if entry is None:
+            return
+        delivery_tag, outcome = entry
+        if method.exchange == '' and method.routing_key == self._queue:
+            # Zelfs de DLQ is niet meer bereikbaar: origineel laten staan
+            self._requeue([delivery_tag])
+            return
+        if (method.exchange, method.routing_key) not in self._returned:
+            self._returned.add((method.exchange, method.routing_key))
+            logging.warning(f"Exchange '{method.exchange}' routeert '{method.routing_key}' nergens heen "
+                            f"({method.reply_text}); berichten gaan terug achteraan {self._queue}")
+        self._publish(delivery_tag, 'returned', '', self._queue, properties, body)
+
+    def _on_confirm(self, frame):
+        method = frame.method
+        if method.multiple:
+            confirmed = []
+            while self._outstanding and next(iter(self._outstanding)) <= method.delivery_tag:
+                confirmed.append(self._outstanding.popitem(last=False)[1])
+        else:
+            entry = self._outstanding.pop(method.delivery_tag, None)
+            confirmed = [entry] if entry is not None else []
+        tags = [delivery_tag for delivery_tag, outcome in confirmed]
+
+        if isinstance(method, pika.spec.Basic.Nack):
+            # Broker kon de publicatie niet aannemen: origineel terug in de DLQ
+            self._requeue(tags)
+            return
+        for delivery_tag, outcome in confirmed:
+            self.stats[outcome] += 1
+        self._settled.update(tags)
+        self._settle(len(tags))
+
+    def _requeue(self, tags):
+        """Nack originelen terug de DLQ in"""
+        for delivery_tag in tags:
+            self._consume_channel.basic_nack(delivery_tag, requeue=True)
+            # Staat niet meer open, dus mag ook niet meer in een multiple-ack terechtkomen
+            self._order.remove(delivery_tag)
+        self.stats['failed'] += len(tags)
+        self._settle(len(tags))
+
+    def _settle(self, count):
+        self._settled_count += count
+        self._ack_settled()
+        if self._settled_count >= self._remaining:
+            self._finish()
+
+    def _ack_settled(self):
+        """Ack alle afgehandelde deliveries vooraan in één multiple-ack"""
+        last = None
+        while self._order and self._order[0] in self._settled:
+            last = self._order.popleft()
+            self._settled.discard(last)
+        if last is not None:
+            # last is zelf bevestigd; ge-nackte tags ervoor staan niet meer open en raakt multiple niet
+            self._consume_channel.basic_ack(last, multiple=True)
+
+    def _on_progress(self):
+        if self._finished:
+            return
+        self._log_progress()
+        idle = time.monotonic() - self._last_activity > self._idle_timeout
+        if idle and not self._outstanding and not self._pending:
+            logging.warning(f"Geen berichten meer binnen {self._idle_timeout:.0f} s, replay gestopt")
+            self._finish()
+            return
+        self._connection.ioloop.call_later(PROGRESS_INTERVAL, self._on_progress)
+
+    def _log_progress(self):
+        elapsed = time.monotonic() - self._started
+        done = self._settled_count
+        logging.info(f"{done}/{self._remaining} afgehandeld ({done / elapsed:.0f}/s): {self.stats}")
+
+    def _finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        if self._remaining:
+            self._log_progress()
+        self._connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('queue', help='de dead-letter queue, bv. pos.dlq')
+    parser.add_argument('--target', choices=('original', 'queue'), default='original',
+                        help="original: oorspronkelijke exchange en routing key; queue: de queue waar het misging")
+    parser.add_argument('--prefetch', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=0.0, help='max berichten per seconde (0 = onbeperkt)')
+    parser.add_argument('--key', help="alleen oorspronkelijke routing keys die hierop matchen (topic-syntax, * en #)")
+    parser.add_argument('--header', action='append', default=[], metavar='NAAM=WAARDE',
+                        help='alleen berichten met deze header (herhaalbaar)')
+    parser.add_argument('--limit', type=int, help='maximaal aantal berichten')
+    parser.add_argument('--idle', type=float, default=5.0, help='stop na zoveel seconden zonder berichten')
+    args = parser.parse_args(argv)
+
+    headers = dict(item.split('=', 1) for item in args.header)
+    parameters = pika.ConnectionParameters(
+        RABBITMQ_HOSTNAME, RABBITMQ_AMQP_PORT, RABBITMQ_VHOST,
+        pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASSWORD),
+    )
+    replayer = DlqReplayer(parameters, args.queue, target=args.target, prefetch=args.prefetch, rate=args.rate,
+                           key_pattern=args.key, headers=headers, limit=args.limit, idle_timeout=args.idle)
+    stats = replayer.run()
+    logging.info(f"Klaar: {stats}")
+    return 1 if stats['failed'] or stats['returned'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
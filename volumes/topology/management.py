@@ -0,0 +1,47 @@
+import base64
+import json
+import urllib.error
+import urllib.request
+from urllib.parse import quote
+
+
+class ManagementError(RuntimeError):
+    pass
+
+
+class ManagementClient:
+    """Minimale client voor de RabbitMQ management HTTP API van één vhost"""
+
+    def __init__(self, url, username, password, vhost, timeout=5.0):
+        self._url = url.rstrip('/')
+        self._vhost = quote(vhost, safe='')
+        self._timeout = timeout
+        token = base64.b64encode(f'{username}:{password}'.encode('utf-8')).decode('ascii')
+        self._headers = {'Authorization': f'Basic {token}', 'Content-Type': 'application/json'}
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self._url + path, data=data, method=method, headers=self._headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self._timeout) as response:
+                payload = response.read()
+        except urllib.error.HTTPError as e:
+            raise ManagementError(f"{method} {path} gaf status {e.code}: {e.read()[:200]!r}") from e
+        except (urllib.error.URLError, OSError) as e:
+            raise ManagementError(f"Management API niet bereikbaar op {self._url}: {e}") from e
+        return json.loads(payload) if payload else None
+
+    def definitions(self):
+        """Alle exchanges, queues, bindings en policies van de vhost in één call"""
+        return self.request('GET', f'/api/definitions/{self._vhost}')
+
+    def put_policy(self, policy):
+        self.request('PUT', f'/api/policies/{self._vhost}/{quote(policy.name, safe="")}', {
+            'pattern': policy.pattern,
+            'apply-to': policy.apply_to,
+            'priority': policy.priority,
+            'definition': policy.definition,
+        })
+
+    def delete_policy(self, name):
+        self.request('DELETE', f'/api/policies/{self._vhost}/{quote(name, safe="")}')
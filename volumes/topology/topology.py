@@ -0,0 +1,221 @@
+"""Declaratieve RabbitMQ-topologie: inlezen uit topology.json en vergelijken met de broker.
+
+topology.json is de enige bron voor exchanges, queues, bindings en policies. Queues staan
+per naam met hun bindings als {exchange: [routing keys]}; durable staat standaard aan en
+"type" kiest classic, quorum of stream. Policies (max-length, overflow, TTL, dead-lettering)
+gelden per groep queues via een pattern en zijn zonder herdeclaratie aan te passen.
+Met een "retry"-blok krijgt elke werkqueue een binding retry.<queue> op de retry-exchange,
+zodat berichten na de TTL van hun .retry-queue terugkeren naar de queue waar ze vandaan kwamen.
+"""
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+Exchange = namedtuple('Exchange', ['name', 'type', 'durable', 'auto_delete', 'internal', 'arguments'])
+Queue = namedtuple('Queue', ['name', 'durable', 'auto_delete', 'arguments'])
+Binding = namedtuple('Binding', ['exchange', 'queue', 'routing_key'])
+Policy = namedtuple('Policy', ['name', 'pattern', 'apply_to', 'priority', 'definition'])
+
+QUEUE_TYPES = ('classic', 'quorum', 'stream')
+
+# Argumenten die de broker zelf invult en die niets veranderen aan de queue
+_IMPLICIT_ARGUMENTS = {'x-queue-type': 'classic'}
+
+
+class Topology:
+    def __init__(self, exchanges=None, queues=None, bindings=None, policies=None):
+        self.exchanges = exchanges or {}
+        self.queues = queues or {}
+        self.bindings = bindings or set()
+        self.policies = policies or {}
+
+    def __len__(self):
+        return len(self.exchanges) + len(self.queues) + len(self.bindings) + len(self.policies)
+
+
+class TopologyError(ValueError):
+    pass
+
+
+@lru_cache(maxsize=65536)
+def topic_matches(pattern, routing_key):
+    """AMQP topic matching: * is precies één woord, # nul of meer woorden"""
+    return _match_words(tuple(pattern.split('.')), tuple(routing_key.split('.')))
+
+
+def _match_words(pattern, words):
+    if not pattern:
+        return not words
+    head = pattern[0]
+    if head == '#':
+        return any(_match_words(pattern[1:], words[i:]) for i in range(len(words) + 1))
+    if not words:
+        return False
+    if head == '*' or head == words[0]:
+        return _match_words(pattern[1:], words[1:])
+    return False
+
+
+def load_topology(path):
+    with open(path, encoding='utf-8') as f:
+        return parse_topology(json.load(f))
+
+
+def parse_topology(data):
+    """Zet de inhoud van topology.json om naar een Topology en controleer de verwijzingen"""
+    topology = Topology()
+    for name, spec in data.get('exchanges', {}).items():
+        topology.exchanges[name] = Exchange(
+            name, spec.get('type', 'direct'), spec.get('durable', True), spec.get('auto_delete', False),
+            spec.get('internal', False), spec.get('arguments', {}),
+        )
+    for name, spec in data.get('queues', {}).items():
+        arguments = dict(spec.get('arguments', {}))
+        queue_type = spec.get('type', 'classic')
+        if queue_type not in QUEUE_TYPES:
+            raise TopologyError(f"Queue {name} heeft onbekend type {queue_type}")
+        if queue_type != 'classic':
+            if not spec.get('durable', True):
+                raise TopologyError(f"Queue {name} van type {queue_type} moet durable zijn")
+            arguments['x-queue-type'] = queue_type
+        topology.queues[name] = Queue(name, spec.get('durable', True), spec.get('auto_delete', False), arguments)
+        for exchange, routing_keys in spec.get('bindings', {}).items():
+            if exchange not in topology.exchanges:
+                raise TopologyError(f"Queue {name} is gebonden aan onbekende exchange {exchange}")
+            for routing_key in routing_keys:
+                topology.bindings.add(Binding(exchange, name, routing_key))
+
+    retry = data.get('retry')
+    if retry:
+        if retry['exchange'] not in topology.exchanges:
+            raise TopologyError(f"Retry-exchange {retry['exchange']} staat niet bij de exchanges")
+        work_queues = re.compile(retry.get('queues', '.*'))
+        for name in topology.queues:
+            if work_queues.search(name):
+                topology.bindings.add(Binding(retry['exchange'], name, f'retry.{name}'))
+
+    for name, spec in data.get('policies', {}).items():
+        topology.policies[name] = Policy(name, spec['pattern'], spec.get('apply-to', 'queues'),
+                                         spec.get('priority', 0), spec.get('definition', {}))
+    return topology
+
+
+def from_definitions(definitions, vhost):
+    """Topology uit de export van de management API (/api/definitions/{vhost})"""
+    topology = Topology()
+    for item in definitions.get('exchanges', []):
+        if item.get('vhost', vhost) != vhost:
+            continue
+        topology.exchanges[item['name']] = Exchange(
+            item['name'], item['type'], item.get('durable', True), item.get('auto_delete', False),
+            item.get('internal', False), item.get('arguments') or {},
+        )
+    for item in definitions.get('queues', []):
+        if item.get('vhost', vhost) != vhost:
+            continue
+        topology.queues[item['name']] = Queue(item['name'], item.get('durable', True),
+                                              item.get('auto_delete', False), item.get('arguments') or {})
+    for item in definitions.get('bindings', []):
+        if item.get('vhost', vhost) != vhost or item.get('destination_type') != 'queue':
+            continue
+        topology.bindings.add(Binding(item['source'], item['destination'], item['routing_key']))
+    for item in definitions.get('policies', []):
+        if item.get('vhost', vhost) != vhost:
+            continue
+        topology.policies[item['name']] = Policy(item['name'], item['pattern'], item.get('apply-to', 'all'),
+                                                 item.get('priority', 0), item.get('definition') or {})
+    return topology
+
+
+def _normalized(arguments):
+    return {key: value for key, value in arguments.items() if _IMPLICIT_ARGUMENTS.get(key) != value}
+
+
+def _differences(desired, current, fields):
+    changes = []
+    for field in fields:
+        wanted, actual = getattr(desired, field), getattr(current, field)
+        if field == 'arguments':
+            wanted, actual = _normalized(wanted), _normalized(actual)
+        if wanted != actual:
+            changes.append(f'{field}: {actual!r} -> {wanted!r}')
+    return changes
+
+
+class Plan:
+    """Wat er op de broker moet gebeuren om bij de gewenste topologie uit te komen.
+
+    changed_exchanges en changed_queues bestaan al met andere instellingen; die kunnen
+    alleen door verwijderen en opnieuw aanmaken goedgezet worden. unbind bevat bindings
+    op beheerde queues die niet (meer) in het bestand staan. policies zijn nieuwe of
+    gewijzigde policies (gewoon overschrijven), stale_policies staan niet in het bestand.
+    """
+
+    def __init__(self):
+        self.exchanges = []
+        self.queues = []
+        self.bindings = []
+        self.changed_exchanges = []
+        self.changed_queues = []
+        self.unbind = []
+        self.policies = []
+        self.stale_policies = []
+
+    def is_empty(self):
+        return not (self.exchanges or self.queues or self.bindings or self.changed_exchanges
+                    or self.changed_queues or self.unbind or self.policies or self.stale_policies)
+
+    def describe(self):
+        """Leesbaar overzicht, één regel per actie"""
+        lines = []
+        lines += [f'+ exchange {exchange.name} ({exchange.type})' for exchange in self.exchanges]
+        lines += [f'~ exchange {exchange.name}: {"; ".join(changes)}' for exchange, changes in self.changed_exchanges]
+        lines += [f'+ queue {queue.name}' for queue in self.queues]
+        lines += [f'~ queue {queue.name}: {"; ".join(changes)}' for queue, changes in self.changed_queues]
+        lines += [f'+ binding {b.exchange} -> {b.queue} [{b.routing_key}]' for b in self.bindings]
+        lines += [f'- binding {b.exchange} -> {b.queue} [{b.routing_key}]' for b in self.unbind]
+        lines += [f'{"~" if changes else "+"} policy {policy.name} ({policy.pattern})'
+                  + (f': {"; ".join(changes)}' if changes else '') for policy, changes in self.policies]
+        lines += [f'- policy {policy.name}' for policy in self.stale_policies]
+        return lines
+
+
+def plan(desired, current):
+    """Vergelijk de gewenste topologie met de huidige staat van de broker"""
+    result = Plan()
+    for name, exchange in desired.exchanges.items():
+        existing = current.exchanges.get(name)
+        if existing is None:
+            result.exchanges.append(exchange)
+            continue
+        changes = _differences(exchange, existing, ('type', 'durable', 'auto_delete', 'internal', 'arguments'))
+        if changes:
+            result.changed_exchanges.append((exchange, changes))
+
+    for name, queue in desired.queues.items():
+        existing = current.queues.get(name)
+        if existing is None:
+            result.queues.append(queue)
+            continue
+        changes = _differences(queue, existing, ('durable', 'auto_delete', 'arguments'))
+        if changes:
+            result.changed_queues.append((queue, changes))
+
+    result.bindings = sorted(desired.bindings - current.bindings)
+    result.unbind = sorted(
+        binding for binding in current.bindings - desired.bindings
+        if binding.queue in desired.queues and binding.exchange in desired.exchanges
+    )
+
+    for name, policy in desired.policies.items():
+        existing = current.policies.get(name)
+        if existing is None:
+            result.policies.append((policy, []))
+            continue
+        changes = _differences(policy, existing, ('pattern', 'apply_to', 'priority', 'definition'))
+        if changes:
+            result.policies.append((policy, changes))
+    result.stale_policies = [policy for name, policy in sorted(current.policies.items())
+                             if name not in desired.policies]
+    return result
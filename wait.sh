@@ -12,4 +12,4 @@ until curl -u "$RABBITMQ_USER:$RABBITMQ_PASS" -s http://rabbitmq:15672/api/healt
 done
 
 # Once RabbitMQ is ready, run the Python script
-echo "RabbitMQ is ready, running configure.py"
+echo "RabbitMQ is ready, running topology/configure.py"